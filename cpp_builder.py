@@ -25,20 +25,30 @@
 # Done: default profile to perform default overrides for each other profile
 # TODO: implicit empty configuration if no config file is found
 # Done: better argument parsing
-# TODO: use a better tool to get the includes off a file
-# FIXME: the include chain stops on the first modified include, instead of reporting all of them
-# FIXME: exported makefile does not rely on the default profile
-# FIXME: the makefile prevent make from detecting if the source files have been modified
+# Done: use a better tool to get the includes off a file
+# Done: the include chain stops on the first modified include, instead of reporting all of them
+# Done: exported makefile does not rely on the default profile
+# Done: the makefile prevent make from detecting if the source files have been modified
+
+from __future__ import annotations # the annotations name modules only imported when needed
 
-import subprocess # execute command on the cmd / bash / whatever
 import os         # get directories file names
 import json       # parse cpp_builder_config.json
-import hashlib    # for calculating hashes
 import threading  # for threading, duh
-import time       # time.sleep
+import time       # time.sleep, time.monotonic
+import signal     # for stopping the compilers with their children
 import sys        # for arguments parsing
 import copy       # for deep copy
-import typing     # for callable
+import re         # for finding includes
+import heapq      # for starting the longest compilations first
+import zlib       # for compressing cached objects
+import fnmatch    # for matching excluded files
+import struct     # for reading inotify events
+import io         # for decoding the output of the commands as it arrives
+import codecs
+
+# subprocess, hashlib, sqlite3, concurrent.futures, socket and the others are imported by the functions using them,
+# so -h, --gen and the config cache hits do not pay for them
 
 
 TEMPLATE = """{
@@ -76,18 +86,41 @@ TEMPLATE = """{
 }
 """
 
-HELP = """Usage: cpp_builder.py -p PROFILE [OPTION]
-   or: cpp_builder.py [--gen | -e | --help | -h]
+HELP = """Usage: cpp_builder.py -p PROFILE[,PROFILE...] [OPTION]
+   or: cpp_builder.py --all-profiles [OPTION]
+   or: cpp_builder.py --worker [--listen [HOST:]PORT] [-n NUM]
+   or: cpp_builder.py [--gen | -e [ninja] | --help | -h]
 
 general options
 
   -a                    rebuild the entire project
-  -p <profile-name>     utilize the given profile specifies in the config file
+  -p <profile-name>     utilize the given profile specifies in the config file, more profiles separated by commas are built together
+      --all-profiles    build together all the profiles in the config file, except default
   -e                    do not compile and export the `cpp_builder_config` as a Makefile
+  -e ninja              do not compile and export the `cpp_builder_config` as a build.ninja
       --gen             writes in the current directory an empty `cpp_builder_config.json` file
-  -n <num-of-threads>   number of parallel threads to execute at the same time, default 12, -1 for as many as compilation units
+  -n <num-of-threads>   number of parallel threads to execute at the same time, default 12, -1 for as many as compilation units,
+                        auto for as many as the cpus and the memory allow, lowered when the machine is loaded by something else
+      --scan-threads <num>  number of threads looking for the includes of new files, default one per cpu
+      --hash <name>     hash algorithm used to detect modified files (sha1, blake2b, ...), default sha1
+      --preprocessed-check  preprocess modified files first and compile them only if the result changed
+      --pch             precompile the headers included by most of the sources
+      --unity <num>     compile the sources of each directory together, in batches of about num sources
+      --fail-fast       stop compiling, terminating the compilers still running, at the first failed unit
+  -k, --keep-going <num>  stop compiling after num failed units, default 0 to compile all of them anyway
+      --report          do not compile and show where the time of the last builds went
+      --watch           build, then stay running and build again every time a file changes
+      --workers <host:port,...>  preprocess here and compile on the given workers, -n is the number of jobs of all of them
+      --worker [--listen <host:port>]  compile what the coordinators send, -n jobs at a time, no profile needed,
+                        on 127.0.0.1:7070 by default, only a port means 127.0.0.1
   -h, --help            print this screen
 
+cache options
+
+      --no-cache        always call the compiler, never reuse objects from the cache
+      --cache-size <MiB>  maximum size of the cache, least recently used objects are removed, default 2048
+      --cache-compression <none|zlib|lzma>  how cached objects are compressed, default none
+
 printing options
 
 	  --skip-empty-reports  do not show reports that are empty
@@ -102,6 +135,126 @@ printing options
 
 CONFIG_FILENAME = "cpp_builder_config.json"
 HASH_FILENAME = "files_hash"
+INCLUDES_CACHE_FILENAME = "includes_cache"
+DEPS_GRAPH_FILENAME = "deps_graph"
+STATE_FILENAME = "state.db"
+
+# profiles of the config already resolved, and the version of their format
+# next to the config, temp_dir is only known once the config is read
+CONFIG_CACHE_FILENAME = ".cpp_builder_config.cache"
+CONFIG_CACHE_VERSION = 2
+
+# keys of the settings taken as they are from a resolved profile
+RESOLVED_KEYS: list[str] = [
+ "type", "compiler", "linker", "include_scanner", "project_path", "exe_path_name", "raw_includes", "includes",
+ "objects_path", "source_dirs", "scripts", "libraries_names", "libraries_paths", "cargs", "largs"
+]
+
+# listings of the source directories, shared by all profiles
+SOURCES_CACHE_FILENAME = "sources.json"
+
+CACHE_DIRNAME = "cache"
+
+# MiB of compiled objects kept in the cache
+CACHE_DEFAULT_SIZE = 2048
+
+CACHE_COMPRESSIONS: list[str] = ["none", "zlib", "lzma"]
+
+PCH_DIRNAME = "pch"
+UNITY_DIRNAME = "unity"
+
+# weight of an include, in bytes of source, when estimating the compile time of a source never compiled
+DURATION_INCLUDE_WEIGHT = 4096
+
+# share of the last compile time in the recorded one, the rest is the previous record
+DURATION_SMOOTHING = 0.5
+
+# runs kept in the timings history
+TIMINGS_HISTORY = 100
+
+# phases shown by --report, in order
+REPORT_PHASES: list[str] = ["config", "discovery", "pre_script", "hashing", "scan", "pch", "compile", "link", "post_script", "startup", "total"]
+
+# runs compared by --report, and how many units are listed
+REPORT_RUNS = 10
+REPORT_SLOWEST = 10
+
+# a phase or unit slower than this times its median is a regression
+REPORT_REGRESSION = 1.5
+
+# inotify events of files created, written, moved or deleted, and the flags of the ones to handle differently
+INOTIFY_CREATE = 0x100
+INOTIFY_MOVED_TO = 0x80
+INOTIFY_ISDIR = 0x40000000
+INOTIFY_IGNORED = 0x8000
+INOTIFY_MASK = 0x8 | 0x40 | 0x80 | 0x100 | 0x200
+
+# seconds waited after a change for the others of the same save, and between two polls without inotify
+WATCH_DEBOUNCE = 0.05
+WATCH_POLL_INTERVAL = 0.5
+
+WATCH_SOCKET_FILENAME = "watch.sock"
+
+# extension of the preprocessed sources sent to the workers, for each language
+REMOTE_EXTENSIONS: dict[str, str] = {"c": "i", "c++": "ii"}
+
+# seconds a worker has to answer, and after which a failed worker is tried again
+WORKER_TIMEOUT = 600
+WORKER_RETRY_DELAY = 30
+
+# compilers a worker accepts to run, and the only arguments it passes them, the others could read or write any file
+WORKER_COMPILERS: list[str] = ["gcc", "g++", "cc", "c++", "clang", "clang++"]
+WORKER_ALLOWED_ARGS: list[str] = [
+ r"-O[0-3sgz]?", r"-Ofast",
+ r"-g[0-3]?", r"-ggdb[0-3]?", r"-gdwarf(-[2-5])?",
+ r"-W[a-zA-Z0-9_=+-]*",
+ r"-f[a-zA-Z0-9_=+.-]*",
+ r"-std=[a-zA-Z0-9+]+",
+ r"-m[a-zA-Z0-9_=.-]*",
+ r"-[DU][a-zA-Z0-9_]+(=[^\s/\\]*)?",
+ r"-pedantic(-errors)?", r"-ansi", r"-pthread", r"-w"
+]
+# -f families that write dumps, profiles or reports, or load plugins and profiles
+WORKER_FORBIDDEN_F_ARGS: list[str] = [
+ "-fdump", "-fplugin", "-fprofile", "-fauto-profile", "-fstack-usage", "-fcallgraph-info", "-fsave-optimization-record",
+ "-fopt-info", "-ftest-coverage", "-fcompare-debug", "-fdiagnostics-format", "-fdiagnostics-add-output", "-fdiagnostics-set-output"
+]
+
+# workers listen on this address when not told otherwise, and on loopback when given only a port
+WORKER_DEFAULT_ADDRESS = "127.0.0.1:7070"
+
+# shared secret of the coordinator and the workers, needed by workers listening beyond loopback
+WORKER_TOKEN_VARIABLE = "CPP_BUILDER_TOKEN"
+
+# objects are passed to the linker through a response file when their list is longer than this
+LINK_RESPONSE_THRESHOLD = 4096
+LINK_RESPONSE_FILENAME = "link.rsp"
+
+# a header is precompiled if included by at least this many sources, and this share of the sources of the same language
+PCH_MIN_SOURCES = 3
+PCH_MIN_SHARE = 0.5
+
+# and if it has not been modified for this many seconds
+PCH_STABLE_TIME = 24 * 60 * 60
+
+# language of the precompiled header for each source extension
+PCH_LANGUAGES: dict[str, str] = {"c": "c", "cpp": "c++", "cxx": "c++", "c++": "c++", "cc": "c++", "C": "c++"}
+
+STATE_VERSION = 3
+
+STATE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (path TEXT PRIMARY KEY, hash TEXT NOT NULL, mtime_ns INTEGER, size INTEGER, inode INTEGER) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS includes_cache (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, includes TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS sources (path TEXT PRIMARY KEY) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS dependencies (source TEXT NOT NULL, header TEXT NOT NULL, PRIMARY KEY (source, header)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS dependencies_header ON dependencies (header);
+CREATE TABLE IF NOT EXISTS objects (source TEXT PRIMARY KEY, object TEXT, command TEXT, preprocessed TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS links (target TEXT PRIMARY KEY, fingerprint TEXT) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS durations (source TEXT PRIMARY KEY, seconds REAL) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS runs (id INTEGER PRIMARY KEY, started REAL, threads INTEGER, result TEXT);
+CREATE TABLE IF NOT EXISTS timings (run INTEGER NOT NULL, kind TEXT, name TEXT, seconds REAL);
+CREATE INDEX IF NOT EXISTS timings_run ON timings (run);
+"""
 
 DEFAULT_COMPILER = "gcc"
 
@@ -118,6 +271,24 @@ EMPTY_PROFILE = {
 
 SPINNERS: list[str] = ["|", "/", "-", "\\"]
 
+# concurrent commands when -n is not given
+DEFAULT_THREADS = 12
+
+# with -n auto, each command is expected to use this many MiB of memory
+AUTO_MEMORY_PER_JOB = 512
+
+# with -n auto, seconds between two checks of the load average
+AUTO_CHECK_INTERVAL = 2.0
+
+# seconds the commands stopped get to exit before being killed
+TERMINATE_TIMEOUT = 5.0
+
+# how many running processes are shown at the same time
+PROGRESS_WINDOW = 10
+
+# minimum seconds between two redraws of the progress
+PROGRESS_INTERVAL = 0.15
+
 SOURCE_FILES_EXTENSIONS: list[str] = ["c", "cpp", "cxx", "c++", "cc", "C", "s"]
 
 COMPILER_SPECIFIC_ARGS: list[dict[str]] = [
@@ -131,6 +302,14 @@ COMPILER_SPECIFIC_ARGS: list[dict[str]] = [
   "library_name": "-l",
   "force_colors": "-fdiagnostics-color=always",
   "no_colors": "-fdiagnostics-color=always",
+  "dependency_file": "-MMD -MF ",
+  "dependency_extension": "d",
+  "preprocess_only": "-E -P",
+  "pch_create": "-x {language}-header -c {header} -o {header}.gch",
+  "pch_use": "-include {header}",
+  "pch_extension": "gch",
+  "response_file": "@",
+  "preprocess_remote": "-E -MMD -MF {dep} -MT {obj} -o {output}",
  }, {
   "compile_only": "/c",
   "output_compiler": "/Fo",
@@ -140,15 +319,35 @@ COMPILER_SPECIFIC_ARGS: list[dict[str]] = [
   "library_path": "/LIBPATH:",
   "library_name": "",
   "force_colors": "",
+  "dependency_file": "/sourceDependencies ",
+  "dependency_extension": "json",
+  "preprocess_only": "/EP",
+  "pch_create": "/c /Yc{header} /FI{header} /Fp{header}.pch /Fo{object} {stub}",
+  "pch_use": "/Yu{header} /FI{header} /Fp{header}.pch",
+  "pch_extension": "pch",
+  "response_file": "@",
+  "preprocess_remote": "",
  }
 ]
 
 COMPILATION_STATUS_COMPILING = 0
 COMPILATION_STATUS_DONE = 1
 COMPILATION_STATUS_FAILED = 2
+COMPILATION_STATUS_CANCELLED = 3
 
 RECURSION_LIMIT = 50
 
+# how much of a file is read at the same time when hashing it
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# characters of the output and of the errors of each command kept in memory, the rest goes to a log file
+OUTPUT_BUFFER_SIZE = 64 * 1024
+OUTPUT_CHUNK_SIZE = 8 * 1024
+LOGS_DIRNAME = "logs"
+
+# only the includes enclosed in double quotes, the ones with <> are system headers
+INCLUDE_REGEX = r'(?m)^[ \t]*#[ \t]*include[ \t]*"([^"]+)"'
+
 
 class COLS:
 	FG_BLACK = "\033[30m"
@@ -230,11 +429,11 @@ class COLS:
 		COLS.RESET = ""
 
 		global PROGRESS_STATUS
-		PROGRESS_STATUS = ["Processing", "Done", "Failed"]
+		PROGRESS_STATUS = ["Processing", "Done", "Failed", "Cancelled"]
 
 
-PROGRRESS_PREFIXES: list[str] = ["|", "+", "-"]
-PROGRESS_STATUS: list[str] = [f"{COLS.FG_BLUE}Processing", f"{COLS.FG_GREEN}Done", f"{COLS.FG_RED}Failed"]
+PROGRRESS_PREFIXES: list[str] = ["|", "+", "-", "x"]
+PROGRESS_STATUS: list[str] = [f"{COLS.FG_BLUE}Processing", f"{COLS.FG_GREEN}Done", f"{COLS.FG_RED}Failed", f"{COLS.FG_YELLOW}Cancelled"]
 
 
 def merge(a: dict, b: dict) -> dict:
@@ -286,44 +485,105 @@ def get_compilation_status(item: dict[str], tick: int = 0) -> str:
 	return prefix + COLS.FG_LIGHT_BLACK + name + suffix + COLS.RESET + "\n"
 
 
+def get_progress_block(statuses: list[dict], tick: int) -> list[str]:
+	"""
+	Returns the lines showing the processes still running, at most PROGRESS_WINDOW of them, plus a counter line
+	"""
+
+	active = [x for x in statuses if x["result"] == COMPILATION_STATUS_COMPILING]
+	failed = sum(1 for x in statuses if x["result"] == COMPILATION_STATUS_FAILED)
+
+	if not active:
+		return []
+
+	lines = [get_compilation_status(x, tick) for x in active[:PROGRESS_WINDOW]]
+
+	if len(active) > PROGRESS_WINDOW:
+		lines.append(f"   {COLS.FG_LIGHT_BLACK}... and {len(active) - PROGRESS_WINDOW} more{COLS.RESET}\n")
+
+	lines.append(f"   {COLS.FG_LIGHT_BLACK}[{len(statuses) - len(active)}/{len(statuses)}] {failed} failed{COLS.RESET}\n")
+
+	return lines
+
+
 def print_progress(statuses: list[dict], settings: dict) -> None:
 	"""
 	Wait for the given process status be completed and prints its status in the meantime
 	Returns when all the processes are done or failed
+
+	Finished processes are printed once, the running ones are kept in a block at the bottom that is redrawn,
+	only where it changed and at most every PROGRESS_INTERVAL seconds. If stdout is not a terminal there is no block
 	"""
 
 	GO_UP = "\x1b[1A"
 	CLEAR_LINE = "\x1b[2K"
 
+	progress = settings["progress"]
+	mode = settings["printing"]["skip_progress"]
+	animate = mode == "none" and sys.stdout.isatty()
+
+	# finished processes already printed
+	printed: set[int] = set()
+
+	# lines of the block currently on screen, the cursor is always right below it
+	block: list[str] = []
+
 	# Animation state
 	tick = 0
+	last_draw = 0.0
 	while True:
-		# How many lines to print at the same time
-		num_lines = 0
-
-		# Check if every process is done
-		all_done = True
-		for item in statuses:
-
-			if settings["printing"]["skip_progress"] == "none":
-				print(get_compilation_status(item, tick), end="")
-				num_lines += 1
-			elif settings["printing"]["skip_progress"] == "progress" and item["result"] == COMPILATION_STATUS_DONE:
-				print(get_compilation_status(item, tick), end="")
-				num_lines += 1
-			if item["result"] == COMPILATION_STATUS_COMPILING:
-				# If someone is still compiling keep looping
-				all_done = False
+
+		with progress:
+			all_done = all(x["result"] != COMPILATION_STATUS_COMPILING for x in statuses)
+			if not all_done:
+				# woken up by any process finishing, or to move the spinners
+				progress.wait(PROGRESS_INTERVAL if animate else 1)
+
+		# many processes finishing together only cause one redraw of the block, without a block there is nothing to wait for
+		if animate and not all_done:
+			time.sleep(max(0, last_draw + PROGRESS_INTERVAL - time.monotonic()))
+		last_draw = time.monotonic()
+
+		out: list[str] = []
+
+		for i, item in enumerate(statuses):
+			if item["result"] == COMPILATION_STATUS_COMPILING or i in printed:
+				continue
+			printed.add(i)
+
+			if mode == "none" or (mode == "progress" and item["result"] == COMPILATION_STATUS_DONE):
+				out.append(get_compilation_status(item, tick))
+
+		if not animate:
+			print("".join(out), end="", flush=True)
+		else:
+			new_block = get_progress_block(statuses, tick)
+
+			# go back to the top of the block
+			out.insert(0, GO_UP * len(block))
+
+			# finished lines push the block down, everything is rewritten
+			if len(out) > 1:
+				out = [out[0]] + [CLEAR_LINE + x for x in out[1:] + new_block]
+				left = len(block) - len(out) + 1
+			else:
+				for i, line in enumerate(new_block):
+					if i < len(block) and block[i] == line:
+						out.append("\n")
+					else:
+						out.append(CLEAR_LINE + line)
+				left = len(block) - len(new_block)
+
+			# clear what remains of an older, longer, block
+			if left > 0:
+				out.append((CLEAR_LINE + "\n") * left + GO_UP * left)
+
+			block = new_block
+			print("".join(out), end="", flush=True)
 
 		if all_done:
 			break
 
-		# Go up 1 line at the time and clear it
-		for i in range(num_lines):
-			print(GO_UP, end=CLEAR_LINE)
-
-		# how quickly to refresh the printing
-		time.sleep(0.15)
 		tick += 1
 
 
@@ -337,6 +597,10 @@ def print_report(statuses: list[dict], settings: dict) -> None:
 
 	for item in statuses:
 
+		# stopped by --fail-fast, --keep-going or ctrl-c, what they printed is not the point
+		if item["result"] == COMPILATION_STATUS_CANCELLED:
+			continue
+
 		if settings["printing"]["skip_reports"] == "empty":
 			if item["output"] == "" and item["errors"] == "":
 				# skip this report
@@ -359,68 +623,158 @@ def print_report(statuses: list[dict], settings: dict) -> None:
 			print(COLS.FG_LIGHT_RED, "    err", COLS.RESET, ":\n", item["errors"], sep="")
 
 
-def compile_and_command(compilation_targets: list[str], settings: dict) -> None:
+def compile_and_command(builds: list[dict], run_start: float) -> None:
 	"""
-	calls compile()
+	calls compile() for all the builds together, recording how long it took since the start to get there
 
 	print compilation status
 
-	calls link() if compilation was fine
+	calls link() for each build whose compilation was fine, one after the other
+
+	sets the exit code of each build, 2 if compilation failed, 3 if linking failed, and the status of each command
 	"""
 
-	# --- Compiling ---
+	settings = builds[0]["settings"]
+
+	# --- Precompiled headers ---
+
+	start = time.monotonic()
+	pch_builds: list[list[dict]] = [build_pch(x["new_hashes"], x["settings"]) if x["settings"]["pch"]["enabled"] else [] for x in builds]
+	all_pch_builds = [x for y in pch_builds for x in y]
+
+	if all_pch_builds:
+		print("\n", COLS.FG_GREEN, " --- Precompiling headers ---", COLS.RESET)
 
-	print("\n", COLS.FG_GREEN, " --- Compiling ---", COLS.RESET)
+		print_progress(all_pch_builds, settings)
+		for job, job_pch_builds in zip(builds, pch_builds):
+			if job_pch_builds:
+				add_timing("pch", start, job["settings"])
+		print("")
+		print_report(all_pch_builds, settings)
+
+	for job, job_pch_builds in zip(builds, pch_builds):
+		for item in job_pch_builds:
+			pch = job["settings"]["pch"]["units"][item["language"]]
+
+			if item["result"] == COMPILATION_STATUS_DONE:
+				with open(pch["header"] + ".stamp", "w") as f:
+					f.write(item["stamp"])
+			else:
+				# compile without it
+				pch["ready"] = False
+
+	# --- Compiling ---
 
 	# where the status of the different compilations is stored
 	compilations: list[dict] = []
-	# compile each file and show the output,
-	# and check for errors
-	compile(compilation_targets, settings, compilations)
 
-	print_progress(compilations, settings)
-	print("")
-	print_report(compilations, settings)
+	# only the link can be needed, when a source has been deleted
+	if any(x["units"] for x in builds):
+		print("\n", COLS.FG_GREEN, " --- Compiling ---", COLS.RESET)
+
+		# compile each file and show the output,
+		# and check for errors
+		start = time.monotonic()
+		limiter = settings["limiter"]
+		limiter["cancelled"] = False
+		limiter["failures"] = 0
+
+		for job in builds:
+			add_timing("startup", run_start, job["settings"])
+
+		try:
+			compile(builds, compilations)
+			print_progress(compilations, settings)
+		except KeyboardInterrupt:
+			# no compiler is left running, nor half an object written
+			cancel_commands(limiter)
+			with settings["progress"]:
+				while any(x["result"] == COMPILATION_STATUS_COMPILING for x in compilations):
+					settings["progress"].wait()
+			for job in builds:
+				remove_partial_objects(job)
+			print(f"\n{COLS.FG_YELLOW} --- Compilation interrupted ---{COLS.RESET}")
+			raise
+
+		if limiter["cancelled"]:
+			for job in builds:
+				remove_partial_objects(job)
+			print(f'\n{COLS.FG_YELLOW} --- Compilation stopped after {limiter["failures"]} failures ---{COLS.RESET}')
+
+		# the links of the builds that compiled everything can still run
+		limiter["cancelled"] = False
+
+		for job in builds:
+			if job["units"]:
+				add_timing("compile", start, job["settings"])
+		print("")
+		print_report(compilations, settings)
+
+	cache = settings["cache"]
+	if cache["enabled"] and compilations:
+		print(f"{COLS.FG_LIGHT_BLACK} cache: {cache['hits']} hits, {cache['misses']} misses{COLS.RESET}")
+
+		if cache["stored"]:
+			trim_cache(settings)
+
+	workers = settings["workers"]
+	if workers["hosts"] and compilations:
+		print(f"{COLS.FG_LIGHT_BLACK} workers: {workers['remote']} compiled remotely, {workers['local']} here after the workers failed{COLS.RESET}")
 
-	compilation_failed: bool = False
+	# --- Linking ---
 
-	for item in compilations:
-		if item["result"] == COMPILATION_STATUS_FAILED: # Failure
-			compilation_failed = True
+	# one after the other, profiles might link the same executable
+	for job in builds:
+		settings = job["settings"]
+		label = settings["label"]
 
-	# all compilations done, linking
-	if compilation_failed:
-		print(f"\n{COLS.FG_RED} --- Linking skipped due to errors in compilation process! ---")
-		sys.exit(2)
+		# all compilations done, linking
+		if any(x["result"] != COMPILATION_STATUS_DONE for x in job["statuses"]):
+			print(f"\n{COLS.FG_RED} --- {label}Linking skipped due to errors in compilation process! ---")
+			job["code"] = 2
+			continue
 
-	# cleaning prev compilation data
-	compilations.clear()
+		objects = get_link_objects(settings)
+		remove_orphan_objects(objects, settings)
 
-	# --- Linking ---
+		if not job["links"]:
+			print(f"\n{COLS.FG_YELLOW} --- {label}Linking skipped, {settings['exe_path_name']} is linked by a later profile ---{COLS.RESET}")
+			continue
 
-	print("\n", COLS.FG_GREEN, " --- Linking ---", COLS.RESET)
+		if not to_relink(objects, settings):
+			print(f"\n{COLS.FG_YELLOW} --- {label}Linking skipped, objects and arguments unchanged ---{COLS.RESET}")
+			continue
 
-	link_status = {
-	 "result": COMPILATION_STATUS_COMPILING,
-	 "name": "",
-	 "output": "",
-	 "errors": "",
-	 "command": ""
-	}
+		print("\n", COLS.FG_GREEN, f" --- {label}Linking ---", COLS.RESET)
+
+		link_status = {
+		 "result": COMPILATION_STATUS_COMPILING,
+		 "name": "",
+		 "output": "",
+		 "errors": "",
+		 "command": ""
+		}
 
-	# Link starts a thread, no need to check anything from him
-	link(compilation_targets, settings, link_status)
+		# Link starts a thread, no need to check anything from him
+		start = time.monotonic()
+		link(objects, settings, link_status)
 
-	print_progress([link_status], settings)
+		print_progress([link_status], settings)
+		add_timing("link", start, settings)
 
-	print("")
+		print("")
 
-	# print
-	print_report([link_status], settings)
+		# print
+		print_report([link_status], settings)
 
-	if link_status["result"] == COMPILATION_STATUS_FAILED:
-		print(f"\n{COLS.FG_RED} --- Errors in linking process! ---")
-		sys.exit(3)
+		job["statuses"].append(link_status)
+
+		if link_status["result"] == COMPILATION_STATUS_FAILED:
+			print(f"\n{COLS.FG_RED} --- {label}Errors in linking process! ---")
+			job["code"] = 3
+			continue
+
+		settings["link"]["fingerprint"] = get_link_fingerprint(objects, settings)
 
 
 def parse_profile_name(args: list[str]) -> str:
@@ -432,14 +786,18 @@ def parse_profile_name(args: list[str]) -> str:
 
 
 def parse_num_threads(args: list[str]) -> int:
+	return parse_number(args, "-n", DEFAULT_THREADS)
+
+
+def parse_number(args: list[str], switch: str, default: int | None) -> int | None:
 	try:
-		return int(args[args.index("-n") + 1])
+		return int(args[args.index(switch) + 1])
 	except ValueError:
 		# default amount
-		return 12
+		return default
 	except IndexError:
 		# default amount
-		return 12
+		return default
 
 
 def parse_file_path(filename: str) -> tuple[str, str, str] | None:
@@ -462,6 +820,8 @@ def parse_file_path(filename: str) -> tuple[str, str, str] | None:
 
 
 def cmd(command: str) -> [subprocess.Popen, str, str]:
+	import subprocess
+
 	stream = subprocess.Popen(command.split(" "), stderr=subprocess.PIPE, stdout=subprocess.PIPE, universal_newlines=True)
 
 	out, err = stream.communicate() # execute the command and get the result
@@ -469,636 +829,3487 @@ def cmd(command: str) -> [subprocess.Popen, str, str]:
 	return stream, out, err
 
 
-def exe_command(command: str, status: dict, sem: threading.Semaphore) -> int:
+def new_limiter(limit: int, auto: bool = False) -> dict:
 	"""
-	execute the given command, set the ouput and return code to the correct structure
+	Returns a limiter that lets at most limit commands run at the same time
+	an auto limiter lowers, and raises back, its limit following the load of the machine
+	once cancelled the commands waiting are not started, and the running ones are terminated
 	"""
 
-	sem.acquire()
+	return {
+	 "condition": threading.Condition(),
+	 "limit": limit,
+	 "base": limit,
+	 "running": 0,
+	 "auto": auto,
+	 "checked": 0.0,
+	 "cancelled": False,
+	 "failures": 0,
+	 "processes": {}
+	}
 
-	stream, out, err = cmd(command)
 
-	ret = COMPILATION_STATUS_DONE
-	if stream.returncode != 0: # the actual program return code, 0 is ok
-		ret = COMPILATION_STATUS_FAILED
+def get_auto_threads() -> int:
+	"""
+	Returns the number of commands the machine can run at the same time:
+	the cpus this process can use, less if there is not enough memory available for each of them
+	"""
 
-	status["output"] = out
-	status["errors"] = err
-	status["result"] = ret
+	try:
+		cpus = len(os.sched_getaffinity(0))
+	except AttributeError:
+		cpus = os.cpu_count() or 1
 
-	sem.release()
+	available = None
+	try:
+		with open("/proc/meminfo", "r") as f:
+			for line in f:
+				if line.startswith("MemAvailable:"):
+					available = int(line.split()[1]) // 1024
+	except (OSError, ValueError):
+		pass
 
-	return ret
+	if available is None:
+		return cpus
+
+	return max(1, min(cpus, available // AUTO_MEMORY_PER_JOB))
+
+
+def set_limit(limiter: dict, limit: int) -> None:
+	"""
+	Change the number of commands that can run at the same time, the ones already running are not stopped
+	the condition is reentrant, it can be called with it already held
+	"""
 
+	with limiter["condition"]:
+		limiter["limit"] = max(1, limit)
+		limiter["condition"].notify_all()
 
-def multi_thread(func: typing.Callable, ret: list, sem: threading.Semaphore, args: tuple):
 
-	sem.acquire()
+def adjust_limit(limiter: dict) -> None:
+	"""
+	Lowers the limit of an auto limiter by the load not caused by its own commands, called with the condition held
+	"""
 
-	ret[0] = func(*args)
+	now = time.monotonic()
+	if not limiter["auto"] or now - limiter["checked"] < AUTO_CHECK_INTERVAL:
+		return
 
-	sem.release()
+	limiter["checked"] = now
 
-	ret[1] = True
+	try:
+		load = os.getloadavg()[0]
+	except (AttributeError, OSError):
+		# no load average on this system, keep the limit
+		limiter["auto"] = False
+		return
 
-	return ret
+	others = max(0.0, load - limiter["running"])
+	set_limit(limiter, min(limiter["base"], round(limiter["base"] - others)))
 
 
-def get_includes(file: str) -> list[str]:
+def acquire_slot(limiter: dict) -> None:
 	"""
-	Returns all of the includes included, directly or indirectly, bt the given file
+	Blocks until there are less commands running than the limit
 	"""
 
-	founds: list[str] = []
-	# org_path: str = parse_file_path(file)[0]
+	with limiter["condition"]:
+		adjust_limit(limiter)
 
-	# TODO: Think about the MSVC children
-	stream, out, err = cmd("cpp -MM " + file)
+		while limiter["running"] >= limiter["limit"]:
+			# wake up once in a while to look at the load again
+			limiter["condition"].wait(AUTO_CHECK_INTERVAL if limiter["auto"] else None)
+			adjust_limit(limiter)
 
-	# long live functional programming innit
-	founds = list(filter(lambda x: x != "\\", out.split()[2:]))
+		limiter["running"] += 1
 
-	return founds
 
+def release_slot(limiter: dict) -> None:
+	with limiter["condition"]:
+		limiter["running"] -= 1
+		limiter["condition"].notify_all()
 
-def parse_config_json(profile: str) -> dict[str, any]:
+
+def get_process_group_args() -> dict:
 	"""
-	Set the global variables by reading the from cpp_builder_config.json
-	the optimization argument decide if debug or release mode
+	Returns the Popen arguments starting a command in its own process group, so it can be stopped with its children
 	"""
 
-	settings: dict[str, any] = {
-	                                          # type of compiler gcc like or rust like generally
-	 "type": "gcc",
-
-	                                          # name of the compiler and linker executable
-	 "compiler": "gcc",
-	 "linker": "gcc",
+	import subprocess
 
-	                                          # compiler and linker args
-	 "cargs": "",
-	 "largs": "",
+	if os.name == "nt":
+		return {"creationflags": subprocess.CREATE_NEW_PROCESS_GROUP}
 
-	                                          # output, includes, filenames swithces (/Fo -o) for msvc, clang, and gcc
-	 "specifics": {},
+	return {"start_new_session": True}
 
-	                                          # path and name of the final executable
-	 "exe_path_name": "",
 
-	                                          # base directory of the project
-	 "project_path": "",
+def signal_process_group(process: subprocess.Popen, kill: bool = False) -> None:
+	"""
+	Stops the command and its children, the compiler driver alone would leave cc1 running
+	"""
 
-	                                          # the string composed by the path of the includes -> "-I./include -I./ext/include -I..."
-	 "includes": "",
+	try:
+		if os.name == "nt" and kill:
+			process.kill()
+		elif os.name == "nt":
+			process.send_signal(signal.CTRL_BREAK_EVENT)
+		else:
+			os.killpg(process.pid, signal.SIGKILL if kill else signal.SIGTERM)
+	except (ProcessLookupError, PermissionError, OSError):
+		# already gone
+		pass
 
-	                                          # list of all the includes as they appear in the config file
-	 "raw_includes": [],
 
-	                                          # directory where to leave the compiled object files
-	 "objects_path": "",
+def kill_commands(limiter: dict, processes: list[subprocess.Popen]) -> None:
+	"""
+	Kills the given commands if they are still running, the ones started after they were terminated are left alone
+	"""
 
-	                                          # directories containing the names of the source directories
-	 "source_files": [],
+	with limiter["condition"]:
+		for process in processes:
+			if process in limiter["processes"]:
+				signal_process_group(process, kill=True)
 
-	                                          # the string composed by the names of the libraries -> "-lpthread -lm ..."
-	 "libraries_names": "",
 
-	                                          # the string composed by the path of the libraries -> "-L./path/to/lib -L..."
-	 "libraries_paths": "",
+def cancel_commands(limiter: dict) -> None:
+	"""
+	Terminates the running commands, the ones still waiting for a slot will not start
+	the ones still running after TERMINATE_TIMEOUT are killed
+	"""
 
-	                                          # name of the scripts to execute
-	 "scripts": {},
+	with limiter["condition"]:
+		limiter["cancelled"] = True
+		for process in limiter["processes"]:
+			limiter["processes"][process] = True
+			signal_process_group(process)
+		processes = list(limiter["processes"])
+		limiter["condition"].notify_all()
 
-	                                          # semaphore to limit the number of concurrent threds that can be executed
-	 "semaphore": threading.Semaphore(12),
+	timer = threading.Timer(TERMINATE_TIMEOUT, kill_commands, args=(limiter, processes))
+	timer.daemon = True
+	timer.start()
 
-	                                          # what to skip when printing
-	 "printing": {
-	  "skip_reports": "none",
-	  "skip_progress": "none",
-	  "colors": True
-	 }
-	}
 
-	# load and parse the file
-	config_filename = "cpp_builder_config.json"
-	if os.path.isfile(config_filename):
-		config_file = json.load(open(config_filename))
-	else:
-		print(COLS.FG_YELLOW, f"[WARNING]{COLS.FG_LIGHT_RED} Config file \"{config_filename}\" not found", COLS.RESET)
-		return dict
+def register_process(limiter: dict, process: subprocess.Popen) -> None:
+	"""
+	Lets cancel_commands() stop the command, it is terminated right away if cancelled while starting
+	"""
 
-	del config_filename
+	with limiter["condition"]:
+		limiter["processes"][process] = limiter["cancelled"]
+		if limiter["cancelled"]:
+			signal_process_group(process)
 
-	# --- Compiler settings ---
-	# get the compiler executable (gcc, g++, clang, rustc, etc)
-	# and the linker executable, plus the type (needed for cli args)
 
-	compiler_settings = get_value(config_file, "compiler")
+def unregister_process(limiter: dict, process: subprocess.Popen) -> bool:
+	"""
+	Forgets the command once it ended, returns if it was terminated
+	"""
 
-	settings["compiler"] = get_value(compiler_settings, "compiler_exe", DEFAULT_COMPILER)
+	with limiter["condition"]:
+		return limiter["processes"].pop(process)
 
-	settings["type"] = get_value(compiler_settings, "compiler_style", DEFAULT_COMPILER)
 
-	# 0 gcc / clang
-	# 1 msvc
-	compiler_type: int = 0
+def add_failure(settings: dict) -> None:
+	"""
+	Counts a failed compilation, and cancels the others once there are as many as --keep-going allows
+	"""
 
-	if settings["type"] == "gcc":
-		compiler_type = 0
-	elif settings["type"] == "clang":
-		compiler_type = 0
-	elif settings["type"] == "msvc":
-		compiler_type = 1
+	limiter = settings["limiter"]
 
-	settings["specifics"] = COMPILER_SPECIFIC_ARGS[compiler_type]
+	with limiter["condition"]:
+		limiter["failures"] += 1
+		stop = settings["stop_after"] > 0 and limiter["failures"] >= settings["stop_after"]
 
-	del compiler_type
+	if stop:
+		cancel_commands(limiter)
 
-	# if no linker is specified use the compiler executable
-	settings["linker"] = get_value(compiler_settings, "linker_exe", settings["compiler"])
 
-	del compiler_settings
+def set_cancelled(status: dict, progress: threading.Condition) -> None:
+	with progress:
+		status["result"] = COMPILATION_STATUS_CANCELLED
+		progress.notify_all()
 
-	#
-	# --- Directories settings ---
-	#
-	# Where is the project
-	# where are the source files and the include files
 
-	directories_settings = get_value(config_file, "directories")
+def get_log_path(name: str, settings: dict) -> str:
+	"""
+	Returns the path, without extension, of the log files of the given command of the profile
+	"""
 
-	# base directory for ALL the other directories and files
-	settings["project_path"] = get_value(directories_settings, "project_dir", "./")
+	return settings["objects_path"] + "/" + settings["profile"] + "/" + LOGS_DIRNAME + "/" + name
 
-	# name of the final executable
-	settings["exe_path_name"] = get_value(directories_settings, "exe_path_name", "a.out")
 
-	os.makedirs(os.path.dirname(settings["exe_path_name"]), exist_ok=True)
+def read_output(pipe, status: dict, key: str, log: str, progress: threading.Condition) -> None:
+	"""
+	Appends to status[key] what the command writes on the pipe as it arrives, so the reports can show it live
+	past OUTPUT_BUFFER_SIZE characters everything goes to the log file instead, so no command can fill the memory
+	"""
 
-	targets: list[str] = []
+	import locale
 
-	old_dir: str = os.getcwd()
-	os.chdir(settings["project_path"])
+	decoder = io.IncrementalNewlineDecoder(codecs.getincrementaldecoder(locale.getpreferredencoding(False))(errors="replace"), translate=True)
+	log_path = f"{log}.{key}.log"
+	spill = None
+	spilled = 0
 
-	for sdir in get_value(directories_settings, "source_dirs", ["src"]):
-		for path, subdirs, files in os.walk(sdir):
-			for name in files:
-				targets.append(f"{path}/{name}")
+	while True:
+		chunk = pipe.read1(OUTPUT_CHUNK_SIZE)
+		text = decoder.decode(chunk, final=not chunk)
+
+		if text and spill is None and log and len(status[key]) + len(text) > OUTPUT_BUFFER_SIZE:
+			os.makedirs(os.path.dirname(log_path), exist_ok=True)
+			spill = open(log_path, "w")
+			spill.write(status[key])
+
+		if spill is not None:
+			spill.write(text)
+			spilled += len(text)
+		elif text:
+			with progress:
+				status[key] += text
+				progress.notify_all()
+
+		if not chunk:
+			break
 
-	os.chdir(old_dir)
+	if spill is not None:
+		spill.close()
+		with progress:
+			status[key] += f"\n... {spilled} more characters in {log_path}\n"
 
-	del old_dir, path, subdirs, files, name, sdir
+	# the log of a previous run would not match the output anymore
+	elif log:
+		try:
+			os.remove(log_path)
+		except OSError:
+			pass
 
-	settings["source_files"] = targets
 
-	del targets
+def exe_command(command: str, status: dict, limiter: dict, progress: threading.Condition, log: str = "") -> int:
+	"""
+	execute the given command, set the ouput and return code to the correct structure
+	the output is read while the command runs, what does not fit in memory goes to the log files starting with log
+	progress is notified when the command is done
+	"""
 
-	#
-	# ---- Incudes ----
-	#
+	import subprocess
 
-	# create the includes args -> -IInclude -ISomelibrary/include -I...
-	for Idir in get_value(directories_settings, "include_dirs", ["include"]):
-		settings["raw_includes"].append(Idir)
-		settings["includes"] += " " + settings["specifics"]["include_path"] + Idir
+	acquire_slot(limiter)
 
-	settings["objects_path"] = get_value(directories_settings, "temp_dir", "obj")
-	os.makedirs(settings["objects_path"], exist_ok=True) # create the obj directory
+	if limiter["cancelled"]:
+		release_slot(limiter)
+		set_cancelled(status, progress)
+		return COMPILATION_STATUS_CANCELLED
 
-	del directories_settings
+	start = time.monotonic()
+	with progress:
+		status["output"] = ""
+		status["errors"] = ""
 
-	#
-	# ----- Profiles -----
-	#
+	try:
+		stream = subprocess.Popen(command.split(" "), stderr=subprocess.PIPE, stdout=subprocess.PIPE, **get_process_group_args())
+	except OSError as e:
+		# a missing compiler fails the command, it must not keep the slot
+		with progress:
+			status["errors"] = f"{e}\n"
+			status["duration"] = time.monotonic() - start
+			status["result"] = COMPILATION_STATUS_FAILED
+			progress.notify_all()
+		release_slot(limiter)
+		return COMPILATION_STATUS_FAILED
+
+	register_process(limiter, stream)
+
+	# both pipes are read together, a command filling one while waiting on the other would never end
+	reader = threading.Thread(target=read_output, args=(stream.stdout, status, "output", log, progress))
+	reader.start()
+	read_output(stream.stderr, status, "errors", log, progress)
+	reader.join()
+
+	stream.wait()
+	status["duration"] = time.monotonic() - start
+
+	terminated = unregister_process(limiter, stream)
 
-	default_settings = merge(EMPTY_PROFILE, get_value(config_file, "default", {}))
+	ret = COMPILATION_STATUS_DONE
+	if terminated:
+		status["terminated"] = True
+		ret = COMPILATION_STATUS_CANCELLED
+	elif stream.returncode != 0: # the actual program return code, 0 is ok
+		ret = COMPILATION_STATUS_FAILED
 
-	profile_settings = merge(default_settings, get_value(config_file, profile, {}))
+	with progress:
+		status["result"] = ret
+		progress.notify_all()
 
-	# --- Scripts settings ---
+	release_slot(limiter)
 
-	settings["scripts"] = get_value(profile_settings, "scripts", default_settings["scripts"])
+	return ret
 
-	settings["profile"] = profile
-	os.makedirs(settings["objects_path"] + "/" + settings["profile"], exist_ok=True) # create the profile directory
 
-	#
-	# --- Libs ---
-	#
+def scan_direct_includes(file: str, settings: dict) -> list[str]:
+	"""
+	Returns the headers directly included by the given file, resolved against the file directory and the include directories
+	Each file is read only if its mtime or size differ from the ones in the cache
+	"""
 
-	# create the library args -> -lSomelib -lSomelib2 -l...
-	for lname in get_value(profile_settings, "libraries_names", default_settings["libraries_names"]):
-		settings["libraries_names"] += " " + settings["specifics"]["library_name"] + lname
+	cache = settings["includes_cache"]
 
-	# cant be sure if it has been created
-	# del lname
+	# already scanned during this run
+	if file in cache["resolved"]:
+		return cache["resolved"][file]
 
-	# create the libraries path args -> -LSomelibrary/lib -L...
-	for ldname in get_value(profile_settings, "libraries_dirs", default_settings["libraries_dirs"]):
-		settings["libraries_paths"] += " " + settings["specifics"]["library_path"] + ldname
+	try:
+		stat = os.stat(file)
+	except OSError:
+		return []
 
-	# cant be sure if it has been created
-	# del ldname
+	entry = cache["parsed"].get(file)
 
-	#
-	# --- Compiler and Linker arguments ---
-	#
+	if entry is None or entry[0] != stat.st_mtime_ns or entry[1] != stat.st_size:
+		with open(file, "r", errors="replace") as f:
+			entry = [stat.st_mtime_ns, stat.st_size, re.findall(INCLUDE_REGEX, f.read())]
+		cache["parsed"][file] = entry
+		cache["dirty"].add(file)
 
-	settings["cargs"] = get_value(profile_settings, "compiler_args", default_settings["compiler_args"])
-	settings["largs"] = get_value(profile_settings, "linker_args", default_settings["linker_args"])
+	# resolution is redone every run, a new header might shadow an old one
+	founds: list[str] = []
+	search_dirs: list[str] = [os.path.dirname(file)] + settings["raw_includes"]
 
-	# fix for empty args
-	if settings["cargs"]:
-		settings["cargs"] = " " + settings["cargs"]
+	for name in entry[2]:
+		for idir in search_dirs:
+			path = os.path.normpath(os.path.join(idir, name))
+			if os.path.isfile(path):
+				founds.append(path)
+				break
 
-	if settings["largs"]:
-		settings["largs"] = " " + settings["largs"]
+	cache["resolved"][file] = founds
 
-	return settings
+	return founds
 
 
-def to_recompile(filename: str, old_hashes: dict, new_hashes: dict) -> bool | str:
+def get_includes(file: str, settings: dict) -> list[str]:
 	"""
-	Given a filename return if it needs to be recompiled
-	A source file needs to be recompiled if it has been modified
-
-	returns the filename is the file needs to be recompiled, false otherwise
+	Returns all of the includes included, directly or indirectly, bt the given file
 	"""
 
-	# get all the includes in one go, and remove any duplicate
-	all_files: list[str] = list(dict.fromkeys(get_includes(filename)))
-	all_files.insert(0, filename)
+	founds: list[str] = []
 
-	res = False
+	if settings["include_scanner"] == "cpp":
+		acquire_slot(settings["limiter"])
+		try:
+			stream, out, err = cmd("cpp -MM " + file)
+		finally:
+			release_slot(settings["limiter"])
 
-	for curr in all_files:
+		# long live functional programming innit
+		founds = list(filter(lambda x: x != "\\", out.split()[2:]))
 
-		if curr in old_hashes:
-			if old_hashes[curr] != new_hashes[curr]:
-				res = filename
-		else:
-			new_hashes[curr] = make_new_file_hash(curr)
+		return founds
+
+	visited: set[str] = {file}
+	to_visit: list[str] = [file]
+
+	while to_visit:
+		for incl in scan_direct_includes(to_visit.pop(), settings):
+			if incl not in visited:
+				visited.add(incl)
+				founds.append(incl)
+				to_visit.append(incl)
+
+	return founds
+
+
+def load_includes_cache(state: sqlite3.Connection) -> dict[str, list]:
+	"""
+	Load the includes found in each file the last time it was scanned
+	"""
+
+	rows = state.execute("SELECT path, mtime_ns, size, includes FROM includes_cache")
+
+	return {path: [mtime, size, includes.split("\n") if includes else []] for path, mtime, size, includes in rows}
+
+
+def save_includes_cache(settings: dict, state: sqlite3.Connection) -> None:
+	"""
+	Write the includes of the files scanned during this run
+	"""
+
+	cache = settings["includes_cache"]
+
+	with state:
+		state.executemany("INSERT OR REPLACE INTO includes_cache VALUES (?, ?, ?, ?)", [(path, cache["parsed"][path][0], cache["parsed"][path][1], "\n".join(cache["parsed"][path][2])) for path in cache["dirty"]])
+
+	cache["dirty"].clear()
+
+
+def get_object_name(file: tuple[str, str, str]) -> str:
+	"""
+	Returns the name, without extension, of the object file produced by the given source
+	"""
+
+	return "".join(file[0].split("/")) + file[1]
+
+
+def get_object_path(file: tuple[str, str, str], settings: dict) -> str:
+	"""
+	Returns the path, without extension, of the object file produced by the given source
+	generated unity sources keep their object next to them
+	"""
+
+	if file[0] == settings["unity"]["dir"]:
+		return f"{file[0]}/{file[1]}"
+
+	return settings["objects_path"] + "/" + settings["profile"] + "/" + get_object_name(file)
+
+
+def get_source_object(file: tuple[str, str, str], settings: dict) -> str:
+	"""
+	Returns the object file that contains the given source, the one of its unity batch if it is in one
+	"""
+
+	batch = settings["unity"]["of"].get(f"{file[0]}/{file[1]}.{file[2]}")
+	if batch is not None:
+		file = parse_file_path(batch)
+
+	return f'{get_object_path(file, settings)}.{settings["specifics"]["object_extension"]}'
+
+
+def load_dependencies(dep_file: str) -> list[str] | None:
+	"""
+	Returns the includes recorded by the compiler in the given dependency file
+	None if the compiler has not written anything yet
+	"""
+
+	try:
+		with open(dep_file, "r") as f:
+			data = f.read()
+	except OSError:
+		return None
+
+	# msvc /sourceDependencies, a json file
+	if dep_file.endswith(".json"):
+		try:
+			return json.loads(data)["Data"]["Includes"]
+		except (ValueError, KeyError, TypeError):
+			return None
+
+	# gcc -MMD, a makefile rule -> "obj.o: source.c include.h \"
+	data = data.replace("\\\n", " ").replace("\\ ", "\0")
+
+	rule_pos = data.find(": ")
+	if rule_pos == -1:
+		return None
+
+	# only the first rule is interesting, the source file is always the first prerequisite
+	prerequisites = data[rule_pos + 2:].split("\n")[0].split()
+
+	return [x.replace("\0", " ") for x in prerequisites[1:]]
+
+
+def load_deps_graph(state: sqlite3.Connection) -> dict:
+	"""
+	Load the dependency graph, for each source its includes (forward) and for each include the sources including it (reverse)
+	"""
+
+	graph: dict = {
+	 "forward": {},
+	 "reverse": {},
+	 "dirty": set(),
+	 "lock": threading.Lock()
+	}
+
+	# sources without includes are known too
+	for (source, ) in state.execute("SELECT path FROM sources"):
+		graph["forward"][source] = []
+
+	for source, header in state.execute("SELECT source, header FROM dependencies"):
+		graph["forward"][source].append(header)
+		graph["reverse"].setdefault(header, set()).add(source)
+
+	return graph
+
+
+def save_deps_graph(graph: dict, state: sqlite3.Connection) -> None:
+	"""
+	Write the includes of the sources changed during this run, all at once or nothing
+	"""
+
+	with graph["lock"], state:
+		for source in graph["dirty"]:
+			state.execute("DELETE FROM dependencies WHERE source = ?", (source, ))
+
+			if source not in graph["forward"]:
+				state.execute("DELETE FROM sources WHERE path = ?", (source, ))
+				continue
+
+			state.execute("INSERT OR IGNORE INTO sources VALUES (?)", (source, ))
+			state.executemany("INSERT OR IGNORE INTO dependencies VALUES (?, ?)", [(source, header) for header in graph["forward"][source]])
+
+		graph["dirty"].clear()
+
+
+def set_dependencies(graph: dict, source: str, includes: list[str]) -> None:
+	"""
+	Replace the includes of source in the graph, keeping the reverse index in sync
+	"""
+
+	with graph["lock"]:
+		for header in graph["forward"].get(source, []):
+			sources = graph["reverse"].get(header)
+			if sources is not None:
+				sources.discard(source)
+				if not sources:
+					del graph["reverse"][header]
+
+		graph["forward"][source] = includes
+		graph["dirty"].add(source)
+
+		for header in includes:
+			graph["reverse"].setdefault(header, set()).add(source)
+
+
+def remove_dependencies(graph: dict, source: str) -> None:
+	"""
+	Remove a source, that no longer exists, from the graph
+	"""
+
+	set_dependencies(graph, source, [])
+
+	with graph["lock"]:
+		del graph["forward"][source]
+
+
+def load_compiled_dependencies(file: tuple[str, str, str], settings: dict) -> list[str] | None:
+	"""
+	Returns the includes the compiler found while compiling the given source,
+	plus the ones in the precompiled header it used, since the compiler does not report those
+	"""
+
+	source = f"{file[0]}/{file[1]}.{file[2]}"
+	batch = settings["unity"]["of"].get(source)
+
+	if batch is None:
+		includes = load_dependencies(f'{get_object_path(file, settings)}.{settings["specifics"]["dependency_extension"]}')
+	else:
+		# all the includes of the batch, but not the other sources in it
+		# the compiler reports them from the batch directory, "obj/unity/../../src/a.c"
+		includes = load_dependencies(f'{get_object_path(parse_file_path(batch), settings)}.{settings["specifics"]["dependency_extension"]}')
+		if includes is not None:
+			includes = [os.path.normpath(x) for x in includes]
+			includes = [x for x in includes if x not in settings["unity"]["batches"][batch]]
+
+	if includes is None:
+		return None
+
+	pch = get_pch(file, settings)
+	if pch is not None:
+		for incl in pch["includes"]:
+			includes += [incl] + get_includes(incl, settings)
+
+	return list(dict.fromkeys(includes))
+
+
+def get_unit_includes(file: tuple[str, str, str], compiled: bool, settings: dict) -> list[str] | None:
+	"""
+	Returns the includes the cache key of the unit is made of, for a unity batch its sources and all of their includes
+	taken from the dependency graph, or from what the compiler just reported once compiled
+	"""
+
+	source = f"{file[0]}/{file[1]}.{file[2]}"
+	members = settings["unity"]["batches"].get(source)
+	forward = settings["deps_graph"]["forward"]
+
+	if members is None:
+		return load_compiled_dependencies(file, settings) if compiled else forward.get(source, [])
+
+	includes = list(members)
+	for member in members:
+		found = load_compiled_dependencies(parse_file_path(member), settings) if compiled else forward.get(member, [])
+		if found is None:
+			return None
+		includes += found
+
+	return list(dict.fromkeys(includes))
+
+
+def update_deps_graph(compiled: list[tuple[str, str, str]], new_hashes: dict, settings: dict) -> None:
+	"""
+	Records in the dependency graph the includes the compiler reported for the compiled files
+	"""
+
+	graph = settings["deps_graph"]
+
+	for file in compiled:
+		includes = load_compiled_dependencies(file, settings)
+		if includes is None:
+			continue
+
+		set_dependencies(graph, f"{file[0]}/{file[1]}.{file[2]}", includes)
+
+		# new includes need an hash to be checked the next time
+		for header in includes:
+			if header not in new_hashes:
+				get_new_hash(header, None, new_hashes, settings)
+
+
+def parse_config_json(profile: str) -> dict[str, any]:
+	"""
+	Set the global variables by reading the from cpp_builder_config.json
+	the optimization argument decide if debug or release mode
+	nothing is created and no source is searched, the commands that need them call prepare_directories() and discover_sources()
+	"""
+
+	import concurrent.futures
+
+	settings: dict[str, any] = {
+	                                          # type of compiler gcc like or rust like generally
+	 "type": "gcc",
+
+	                                          # name of the compiler and linker executable
+	 "compiler": "gcc",
+	 "linker": "gcc",
+
+	                                          # compiler and linker args
+	 "cargs": "",
+	 "largs": "",
+
+	                                          # output, includes, filenames swithces (/Fo -o) for msvc, clang, and gcc
+	 "specifics": {},
+
+	                                          # path and name of the final executable
+	 "exe_path_name": "",
+
+	                                          # base directory of the project
+	 "project_path": "",
+
+	                                          # the string composed by the path of the includes -> "-I./include -I./ext/include -I..."
+	 "includes": "",
+
+	                                          # list of all the includes as they appear in the config file
+	 "raw_includes": [],
+
+	                                          # directory where to leave the compiled object files
+	 "objects_path": "",
+
+	                                          # printed before the names of units and phases, when building more profiles at once
+	 "label": "",
+
+	                                          # directories containing the sources, and the sources found in them
+	 "source_dirs": [],
+	 "source_files": [],
+
+	                                          # globs of the sources to compile, and of the sources and directories to leave out
+	 "source_globs": {
+	  "include": [],
+	  "exclude": []
+	 },
+
+	                                          # the string composed by the names of the libraries -> "-lpthread -lm ..."
+	 "libraries_names": "",
+
+	                                          # the string composed by the path of the libraries -> "-L./path/to/lib -L..."
+	 "libraries_paths": "",
+
+	                                          # name of the scripts to execute
+	 "scripts": {},
+
+	                                          # limits the number of concurrent commands, shared by compilation, scan and link
+	 "limiter": new_limiter(DEFAULT_THREADS),
+
+	                                          # notified every time a command is done, to update the progress
+	 "progress": threading.Condition(),
+
+	                                          # max number of threads scanning files for includes, None for one per cpu
+	 "scan_threads": None,
+
+	                                          # workers compiling the preprocessed sources, jobs sent to each, and when the failed ones can be tried again
+	 "workers": {
+	  "hosts": [],
+	  "jobs": {},
+	  "failed": {},
+	  "remote": 0,
+	  "local": 0,
+	  "versions": {},
+	  "lock": threading.Lock()
+	 },
+
+	                                          # how to find the includes of a file not yet compiled, "builtin" or "cpp"
+	 "include_scanner": "builtin",
+
+	                                          # includes found by the builtin scanner, "parsed" is persisted, "resolved" lasts one run, "dirty" are to be saved
+	 "includes_cache": {
+	  "parsed": {},
+	  "resolved": {},
+	  "dirty": set()
+	 },
+
+	                                          # hashes each file at most once per run, on a limited number of threads
+	 "hasher": {
+	  "algorithm": "sha1",
+	  "pool": concurrent.futures.ThreadPoolExecutor(),
+	  "pending": {},
+	  "lock": threading.Lock()
+	 },
+
+	                                          # includes of each source and sources including each header
+	 "deps_graph": {
+	  "forward": {},
+	  "reverse": {},
+	  "dirty": set(),
+	  "lock": threading.Lock()
+	 },
+
+	                                          # compiled objects reused when the same source is compiled with the same arguments
+	 "cache": {
+	  "enabled": True,
+	  "dir": "",
+	  "size": CACHE_DEFAULT_SIZE,
+	  "compression": "none",
+	  "compiler_id": None,
+	  "hits": 0,
+	  "misses": 0,
+	  "stored": 0,
+	  "lock": threading.Lock()
+	 },
+
+	                                          # precompiled headers made from the most included headers, for each language
+	 "pch": {
+	  "enabled": False,
+	  "units": {}
+	 },
+
+	                                          # fingerprint of the objects and arguments of the last successful link
+	 "link": {
+	  "fingerprint": None
+	 },
+
+	                                          # sources compiled together in batches of "size" sources, 0 to disable
+	 "unity": {
+	  "size": 0,
+	  "dir": "",
+	  "exclude": [],
+	  "batches": {},
+	  "of": {}
+	 },
+
+	                                          # compare the preprocessed sources before compiling them
+	 "preprocessed_check": False,
+
+	                                          # failed compilations after which the others are cancelled, 0 to compile them all anyway
+	 "stop_after": 0,
+
+	                                          # command used the last time each source has been compiled, and hash of its preprocessed output
+	 "objects": {},
+
+	                                          # seconds spent in each phase of this run, and the threads used
+	 "timings": {
+	  "phases": {},
+	  "threads": DEFAULT_THREADS
+	 },
+
+	                                          # seconds spent compiling each unit, recorded and measured in this run
+	 "durations": {
+	  "known": {},
+	  "measured": {}
+	 },
+
+	                                          # what to skip when printing
+	 "printing": {
+	  "skip_reports": "none",
+	  "skip_progress": "none",
+	  "colors": True
+	 }
+	}
+
+	config = load_config()
+	if config is None:
+		return dict
+
+	# a profile not in the config is made of the default one
+	resolved = config["profiles"].get(profile, config["profiles"]["default"])
+
+	for key in RESOLVED_KEYS:
+		settings[key] = copy.deepcopy(resolved[key])
+
+	settings["specifics"] = COMPILER_SPECIFIC_ARGS[1 if settings["type"] == "msvc" else 0]
+
+	settings["cache"]["dir"] = resolved["cache_dir"]
+	settings["unity"]["exclude"] = resolved["unity_exclude"]
+	settings["source_globs"]["include"] = resolved["source_include"]
+	settings["source_globs"]["exclude"] = resolved["source_exclude"]
+
+	settings["profile"] = profile
+	settings["unity"]["dir"] = settings["objects_path"] + "/" + settings["profile"] + "/" + UNITY_DIRNAME
+
+	return settings
+
+
+def resolve_profile(config_file: dict, profile: str) -> dict[str, any]:
+	"""
+	Returns the values of the given profile of the config file, merged with the default profile
+	only plain values, so they can be kept in the config cache
+	"""
+
+	resolved: dict[str, any] = {}
+
+	# --- Compiler settings ---
+	# get the compiler executable (gcc, g++, clang, rustc, etc)
+	# and the linker executable, plus the type (needed for cli args)
+
+	compiler_settings = get_value(config_file, "compiler")
+
+	resolved["compiler"] = get_value(compiler_settings, "compiler_exe", DEFAULT_COMPILER)
+
+	resolved["type"] = get_value(compiler_settings, "compiler_style", DEFAULT_COMPILER)
+
+	# 0 gcc / clang
+	# 1 msvc
+	specifics = COMPILER_SPECIFIC_ARGS[1 if resolved["type"] == "msvc" else 0]
+
+	# if no linker is specified use the compiler executable
+	resolved["linker"] = get_value(compiler_settings, "linker_exe", resolved["compiler"])
+
+	resolved["include_scanner"] = get_value(compiler_settings, "include_scanner", "builtin")
+
+	del compiler_settings
+
+	#
+	# --- Directories settings ---
+	#
+	# Where is the project
+	# where are the source files and the include files
+
+	directories_settings = get_value(config_file, "directories")
+
+	# base directory for ALL the other directories and files
+	resolved["project_path"] = get_value(directories_settings, "project_dir", "./")
+
+	# name of the final executable
+	resolved["exe_path_name"] = get_value(directories_settings, "exe_path_name", "a.out")
+
+	#
+	# ---- Incudes ----
+	#
+
+	# create the includes args -> -IInclude -ISomelibrary/include -I...
+	resolved["raw_includes"] = []
+	resolved["includes"] = ""
+	for Idir in get_value(directories_settings, "include_dirs", ["include"]):
+		resolved["raw_includes"].append(Idir)
+		resolved["includes"] += " " + specifics["include_path"] + Idir
+
+	resolved["objects_path"] = get_value(directories_settings, "temp_dir", "obj")
+
+	# shared by all profiles, objects with the same arguments are reused
+	resolved["cache_dir"] = get_value(directories_settings, "cache_dir", resolved["objects_path"] + "/" + CACHE_DIRNAME)
+
+	resolved["unity_exclude"] = get_value(directories_settings, "unity_exclude", [])
+
+	resolved["source_dirs"] = get_value(directories_settings, "source_dirs", ["src"])
+	resolved["source_include"] = get_value(directories_settings, "source_include", ["*"])
+	resolved["source_exclude"] = get_value(directories_settings, "source_exclude", [])
+
+	del directories_settings
+
+	#
+	# ----- Profiles -----
+	#
+
+	default_settings = merge(EMPTY_PROFILE, get_value(config_file, "default", {}))
+
+	profile_settings = merge(default_settings, get_value(config_file, profile, {}))
+
+	# the keys the profile sets itself, the exports refer to the default values for the others
+	resolved["overrides"] = sorted(get_value(config_file, profile, {}))
+
+	# --- Scripts settings ---
+
+	resolved["scripts"] = get_value(profile_settings, "scripts", default_settings["scripts"])
+
+	# a profile can have an executable of its own
+	resolved["exe_path_name"] = get_value(profile_settings, "exe_path_name", resolved["exe_path_name"])
+
+	#
+	# --- Libs ---
+	#
+
+	# create the library args -> -lSomelib -lSomelib2 -l...
+	resolved["libraries_names"] = ""
+	for lname in get_value(profile_settings, "libraries_names", default_settings["libraries_names"]):
+		resolved["libraries_names"] += " " + specifics["library_name"] + lname
+
+	# create the libraries path args -> -LSomelibrary/lib -L...
+	resolved["libraries_paths"] = ""
+	for ldname in get_value(profile_settings, "libraries_dirs", default_settings["libraries_dirs"]):
+		resolved["libraries_paths"] += " " + specifics["library_path"] + ldname
+
+	#
+	# --- Compiler and Linker arguments ---
+	#
+
+	resolved["cargs"] = get_value(profile_settings, "compiler_args", default_settings["compiler_args"])
+	resolved["largs"] = get_value(profile_settings, "linker_args", default_settings["linker_args"])
+
+	# fix for empty args
+	if resolved["cargs"]:
+		resolved["cargs"] = " " + resolved["cargs"]
+
+	if resolved["largs"]:
+		resolved["largs"] = " " + resolved["largs"]
+
+	return resolved
+
+
+def load_config() -> dict | None:
+	"""
+	Returns the profiles of cpp_builder_config.json, already resolved, from the config cache
+	The config is parsed again only if it changed: when its mtime or size differ from the cached ones it is hashed,
+	and only if the hash differs too the profiles are resolved again
+	"""
+
+	import hashlib
+
+	config_filename = "cpp_builder_config.json"
+	try:
+		stat = os.stat(config_filename)
+	except OSError:
+		print(COLS.FG_YELLOW, f"[WARNING]{COLS.FG_LIGHT_RED} Config file \"{config_filename}\" not found", COLS.RESET)
+		return None
+
+	try:
+		with open(CONFIG_CACHE_FILENAME) as f:
+			config = json.load(f)
+	except (OSError, ValueError):
+		config = {}
+
+	if config.get("version") == CONFIG_CACHE_VERSION and config.get("mtime_ns") == stat.st_mtime_ns and config.get("size") == stat.st_size:
+		return config
+
+	with open(config_filename, "rb") as f:
+		content = f.read()
+
+	digest = hashlib.sha1(content).hexdigest()
+
+	if config.get("version") != CONFIG_CACHE_VERSION or config.get("hash") != digest:
+		config_file = json.loads(content)
+
+		names = [x for x in config_file if x not in ["scripts", "compiler", "directories"]]
+		config = {
+		 "version": CONFIG_CACHE_VERSION,
+		 "hash": digest,
+		 "names": names,
+		 "profiles": {x: resolve_profile(config_file, x) for x in names + ["default"]}
+		}
+
+	config["mtime_ns"] = stat.st_mtime_ns
+	config["size"] = stat.st_size
+
+	# replaced at once, a builder started meanwhile reads the old or the new one
+	try:
+		with open(CONFIG_CACHE_FILENAME + ".tmp", "w") as f:
+			json.dump(config, f, separators=(",", ":"))
+		os.replace(CONFIG_CACHE_FILENAME + ".tmp", CONFIG_CACHE_FILENAME)
+	except OSError:
+		pass
+
+	return config
+
+
+def prepare_directories(settings: dict) -> None:
+	"""
+	Creates the directories of the objects and of the executable of the profile, only needed to build it
+	"""
+
+	if os.path.dirname(settings["exe_path_name"]):
+		os.makedirs(os.path.dirname(settings["exe_path_name"]), exist_ok=True)
+
+	os.makedirs(settings["objects_path"] + "/" + settings["profile"], exist_ok=True) # create the obj and profile directories
+
+
+def to_recompile(filename: str, old_hashes: dict, new_hashes: dict, dep_file: str, settings: dict) -> bool | str:
+	"""
+	Given a filename return if it needs to be recompiled
+	A source file needs to be recompiled if it has been modified
+
+	returns the filename is the file needs to be recompiled, false otherwise
+	"""
+
+	# the compiler already told us the includes the last time it compiled this file,
+	# scan the file only if nothing has been recorded
+	includes = load_dependencies(dep_file)
+	if includes is None:
+		includes = get_includes(filename, settings)
+
+	# remove any duplicate
+	all_files: list[str] = list(dict.fromkeys(includes))
+
+	set_dependencies(settings["deps_graph"], filename, list(all_files))
+
+	all_files.insert(0, filename)
+
+	res = False
+
+	for curr in all_files:
+
+		if curr in old_hashes:
+			if is_modified(curr, old_hashes, new_hashes):
+				res = filename
+		else:
+			get_new_hash(curr, None, new_hashes, settings)
 			res = filename
 
-	return res
+	return res
+
+
+def get_hash_algorithm(stored: str) -> str:
+	"""
+	Returns the algorithm of a stored hash, "sha1" for the ones without prefix
+	"""
+
+	# the algorithm names have no "-", the hex digests neither
+	return stored.split("-", 1)[0] if "-" in stored else "sha1"
+
+
+def make_new_file_hash(file: str, old: list | None = None, algorithm: str = "sha1") -> list:
+	"""
+	Calculate the hash for the given file, returns [hash, mtime_ns, size, inode]
+	If the file stats are the same as the old ones the file is not read and old is returned
+	"""
+
+	import hashlib
+
+	# i need to re-instantiate the object to empty it
+	digest = hashlib.new(algorithm)
+
+	# sha1 hashes are stored as they are, for compatibility with older files_hash
+	prefix = "" if algorithm == "sha1" else algorithm + "-"
+
+	try:
+		stat = os.stat(file)
+	except OSError:
+		# a missing file has the hash of an empty one
+		return [prefix + digest.hexdigest(), 0, 0, 0]
+
+	stats = [stat.st_mtime_ns, stat.st_size, stat.st_ino]
+
+	# untouched file, same content, unless it was hashed with another algorithm
+	if old is not None and old[1:] == stats and get_hash_algorithm(old[0]) == algorithm:
+		return old
+
+	try:
+		# read in chunks, big files are never entirely in memory
+		with open(file, "rb") as f:
+			if hasattr(hashlib, "file_digest"):
+				digest = hashlib.file_digest(f, algorithm)
+			else:
+				for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+					digest.update(chunk)
+	except OSError:
+		pass
+
+	return [prefix + digest.hexdigest()] + stats # create the new hash
+
+
+def get_new_hash(file: str, old: list | None, new_hashes: dict, settings: dict) -> list:
+	"""
+	Returns the new hash of the given file and puts it in new_hashes
+	Each file is hashed at most once per run, even if requested by many threads at the same time
+	"""
+
+	hasher = settings["hasher"]
+
+	with hasher["lock"]:
+		future = hasher["pending"].get(file)
+		if future is None:
+			future = hasher["pool"].submit(make_new_file_hash, file, old, hasher["algorithm"])
+			hasher["pending"][file] = future
+
+	res = future.result()
+
+	with hasher["lock"]:
+		new_hashes[file] = res
+
+	return res
+
+
+def is_modified(file: str, old_hashes: dict, new_hashes: dict) -> bool:
+	"""
+	A file is modified only if its content is, stats alone do not matter
+	"""
+
+	return old_hashes[file][0] != new_hashes[file][0]
+
+
+def calculate_new_hashes(old_hashes: dict, new_hashes: dict, settings: dict) -> None:
+	"""
+	Calculate the hashes for all the source files
+	"""
+
+	hasher = settings["hasher"]
+
+	# queue everything first, so the files are hashed in parallel
+	with hasher["lock"]:
+		for file in old_hashes: # loop trough every file of each directory
+			if file not in hasher["pending"]:
+				hasher["pending"][file] = hasher["pool"].submit(make_new_file_hash, file, old_hashes[file], hasher["algorithm"])
+
+	for file in old_hashes:
+		get_new_hash(file, old_hashes[file], new_hashes, settings)
+
+
+def load_old_hashes(state: sqlite3.Connection) -> dict[str, list]:
+	"""
+	Load in old_hashes the hashes present in the state
+	"""
+
+	return {path: [digest, mtime, size, inode] for path, digest, mtime, size, inode in state.execute("SELECT path, hash, mtime_ns, size, inode FROM files")}
+
+
+def save_new_hashes(new_hashes: dict[str, list], old_hashes: dict[str, list], state: sqlite3.Connection) -> None:
+	"""
+	Write the hashes that changed since they have been loaded, all at once or nothing
+	"""
+
+	with state:
+		state.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", [[path] + entry for path, entry in new_hashes.items() if old_hashes.get(path) != entry])
+
+
+def load_legacy_hashes(filename: str) -> dict[str, list]:
+	"""
+	Load the hashes present in the old files_hash text file
+	each line is "path:hash:mtime_ns:size:inode", the older "path:hash" is still accepted
+	"""
+	hashes: dict[str, list] = {}
+
+	# read hashes from files and add them to old_hashes array
+	with open(filename, "r") as f:
+		while True:
+			data = f.readline()
+			if not data:
+				break
+
+			# remove trailing newline
+			data = data.replace("\n", "")
+
+			# split from the right, the path might contain ':'
+			temp = data.rsplit(":", 4)
+
+			if len(temp) == 5 and all(x.isdigit() for x in temp[2:]):
+				hashes[temp[0]] = [temp[1], int(temp[2]), int(temp[3]), int(temp[4])]
+			else:
+				# no stats, the file will be hashed again
+				temp = data.rsplit(":", 1)
+				hashes[temp[0]] = [temp[1], 0, 0, 0]
+
+	return hashes
+
+
+def open_state(directory: str) -> sqlite3.Connection:
+	"""
+	Open the database holding hashes, includes and objects of the profile
+	The old text files are imported, and then removed, the first time
+	"""
+
+	import sqlite3
+
+	state = sqlite3.connect(directory + STATE_FILENAME)
+
+	# wal makes each commit a single append, a crash leaves the last committed state
+	state.execute("PRAGMA journal_mode = WAL")
+	state.execute("PRAGMA synchronous = NORMAL")
+
+	version = state.execute("PRAGMA user_version").fetchone()[0]
+
+	state.executescript(STATE_SCHEMA)
+
+	# columns added after the table was created
+	if 0 < version < 2:
+		state.execute("ALTER TABLE objects ADD COLUMN preprocessed TEXT")
+	if 0 < version < 3:
+		state.execute("ALTER TABLE runs ADD COLUMN result TEXT")
+
+	state.execute(f"PRAGMA user_version = {STATE_VERSION}")
+
+	migrate_legacy_state(state, directory)
+
+	return state
+
+
+def migrate_legacy_state(state: sqlite3.Connection, directory: str) -> None:
+	"""
+	Import files_hash, includes_cache and deps_graph in the state, then delete them
+	"""
+
+	legacy_files = [directory + HASH_FILENAME, directory + INCLUDES_CACHE_FILENAME, directory + DEPS_GRAPH_FILENAME]
+
+	if not any(os.path.exists(x) for x in legacy_files):
+		return
+
+	with state:
+		if os.path.exists(legacy_files[0]):
+			hashes = load_legacy_hashes(legacy_files[0])
+			state.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)", [[path] + entry for path, entry in hashes.items()])
+
+		try:
+			with open(legacy_files[1], "r") as f:
+				cache = json.load(f)
+			state.executemany("INSERT OR REPLACE INTO includes_cache VALUES (?, ?, ?, ?)", [(path, entry[0], entry[1], "\n".join(entry[2])) for path, entry in cache.items()])
+		except (OSError, ValueError):
+			pass
+
+		try:
+			with open(legacy_files[2], "r") as f:
+				forward = json.load(f)["forward"]
+			state.executemany("INSERT OR IGNORE INTO sources VALUES (?)", [(source, ) for source in forward])
+			state.executemany("INSERT OR IGNORE INTO dependencies VALUES (?, ?)", [(source, header) for source in forward for header in forward[source]])
+		except (OSError, ValueError, KeyError):
+			pass
+
+	for file in legacy_files:
+		if os.path.exists(file):
+			os.remove(file)
+
+
+def load_objects(state: sqlite3.Connection) -> dict[str, dict]:
+	"""
+	Load the object each source has been compiled in the last time, with which command, and the hash of its preprocessed output
+	"""
+
+	return {source: {"object": obj, "command": command, "preprocessed": preprocessed} for source, obj, command, preprocessed in state.execute("SELECT source, object, command, preprocessed FROM objects")}
+
+
+def save_objects(compiled: list[tuple[str, str, str]], settings: dict, state: sqlite3.Connection) -> None:
+	"""
+	Record the object and the command of each compiled source
+	"""
+
+	rows: list[tuple[str, str, str, str | None]] = []
+
+	for file in compiled:
+		source = f"{file[0]}/{file[1]}.{file[2]}"
+		meta = settings["objects"].setdefault(source, {"preprocessed": None})
+		meta["command"] = get_compile_command(file, settings)
+		meta["object"] = get_source_object(file, settings)
+		rows.append((source, meta["object"], meta["command"], meta["preprocessed"]))
+
+	with state:
+		state.executemany("INSERT OR REPLACE INTO objects VALUES (?, ?, ?, ?)", rows)
+		# sources deleted
+		state.executemany("DELETE FROM objects WHERE source = ?", [(x, ) for x, in state.execute("SELECT source FROM objects").fetchall() if x not in settings["objects"]])
+
+
+def get_to_compile(source_files: list[str], old_hashes: dict, new_hashes: dict, settings: dict) -> list[str]:
+	"""
+	return a list of files and their directories that need to be compiled
+	"""
+
+	import concurrent.futures
+
+	to_compile: list[tuple[str, str, str]] = [] # contains directory and filename
+
+	dep_ext = settings["specifics"]["dependency_extension"]
+	graph = settings["deps_graph"]
+
+	# every source including a new or modified header, straight from the reverse index
+	affected: set[str] = set()
+	for header, sources in graph["reverse"].items():
+		if header not in old_hashes:
+			get_new_hash(header, None, new_hashes, settings)
+			affected.update(sources)
+		elif is_modified(header, old_hashes, new_hashes):
+			affected.update(sources)
+
+	# checking which file need to be compiled
+	file: str = ""
+	rets: list[concurrent.futures.Future] = []
+	sources_found: set[str] = set()
+
+	# the unknown files are scanned by a fixed amount of threads
+	pool = concurrent.futures.ThreadPoolExecutor(max_workers=settings["scan_threads"] or os.cpu_count() or 1)
+	for file in source_files: # only sources, discover_sources already filtered them
+
+		fname = parse_file_path(file)
+		sources_found.add(file)
+
+		# includes already known, no need to look at them
+		if file in graph["forward"]:
+			if file not in old_hashes:
+				get_new_hash(file, None, new_hashes, settings)
+				to_compile.append(fname)
+			elif file in affected or is_modified(file, old_hashes, new_hashes):
+				to_compile.append(fname)
+			elif file in settings["objects"] and settings["objects"][file]["command"] != get_compile_command(fname, settings):
+				# compiled with different arguments
+				to_compile.append(fname)
+			elif file in settings["objects"] and settings["objects"][file]["object"] != get_source_object(fname, settings):
+				# moved in or out of a unity batch
+				to_compile.append(fname)
+			continue
+
+		dep_file = f"{get_object_path(fname, settings)}.{dep_ext}"
+
+		rets.append(pool.submit(to_recompile, file, old_hashes, new_hashes, dep_file, settings))
+
+	# blocks until every scan is done
+	pool.shutdown(wait=True)
+
+	for i in rets:
+		res = i.result()
+		if res is not False:
+			fname = parse_file_path(res)
+			to_compile.append(fname)
+
+	# forget the sources that have been deleted
+	for file in [x for x in graph["forward"] if x not in sources_found]:
+		remove_dependencies(graph, file)
+	for file in [x for x in settings["objects"] if x not in sources_found]:
+		del settings["objects"][file]
+
+	return to_compile
+
+
+def get_compile_command(file: tuple[str, str, str], settings: dict, colors: str = "") -> str:
+	"""
+	Returns the command that compiles the given source file
+	"""
+
+	cexe = settings["compiler"]
+	includes = settings["includes"]
+	cargs = settings["cargs"]
+	oargs = settings["specifics"]
+	obj_path: str = get_object_path(file, settings)
+
+	# no double spaces, they would become empty arguments
+	if colors:
+		cexe += " " + colors
+
+	# let the compiler record the includes, so they don't need to be scanned on the next run
+	deps = f'{oargs["dependency_file"]}{obj_path}.{oargs["dependency_extension"]}'
+
+	pch = get_pch(file, settings)
+	if pch is not None:
+		deps += " " + oargs["pch_use"].format(header=pch["header"])
+
+	return f'{cexe}{cargs}{includes} {deps} {oargs["compile_only"]} {oargs["output_compiler"]}{obj_path}.{oargs["object_extension"]} {file[0]}/{file[1]}.{file[2]}'
+
+
+def select_pch_headers(settings: dict) -> None:
+	"""
+	Chooses, for each language, the headers to precompile, the ones included by most of the sources and not recently modified
+	"""
+
+	graph = settings["deps_graph"]
+	obj_dir = settings["objects_path"] + "/" + settings["profile"]
+	now = time.time()
+
+	sources_per_language: dict[str, int] = {}
+	for source in graph["forward"]:
+		language = PCH_LANGUAGES.get(parse_file_path(source)[2])
+		if language is not None:
+			sources_per_language[language] = sources_per_language.get(language, 0) + 1
+
+	candidates: dict[str, list[tuple[int, str]]] = {}
+
+	for header, sources in graph["reverse"].items():
+		# never precompile the precompiled headers
+		if header.startswith(f"{obj_dir}/{PCH_DIRNAME}/"):
+			continue
+
+		try:
+			if now - os.stat(header).st_mtime < PCH_STABLE_TIME:
+				continue
+		except OSError:
+			continue
+
+		users: dict[str, int] = {}
+		for source in sources:
+			language = PCH_LANGUAGES.get(parse_file_path(source)[2])
+			if language is not None:
+				users[language] = users.get(language, 0) + 1
+
+		for language, count in users.items():
+			if count >= PCH_MIN_SOURCES and count >= sources_per_language[language] * PCH_MIN_SHARE:
+				candidates.setdefault(language, []).append((-count, header))
+
+	settings["pch"]["units"] = {}
+
+	for language, headers in candidates.items():
+		# most used first
+		headers.sort()
+
+		name = f'{obj_dir}/{PCH_DIRNAME}/pch_{language.replace("+", "p")}.h'
+		stub = name + (".c" if language == "c" else ".cpp")
+		settings["pch"]["units"][language] = {
+		 "header": name,
+		 "object": f'{obj_dir}/pch_{os.path.basename(stub)}.{settings["specifics"]["object_extension"]}',
+		 "includes": [x[1] for x in headers],
+		 "ready": True
+		}
+
+
+def get_pch(file: tuple[str, str, str], settings: dict) -> dict | None:
+	"""
+	Returns the precompiled header to use for the given source
+	only sources that already include all of its headers use it
+	"""
+
+	if not settings["pch"]["enabled"]:
+		return None
+
+	pch = settings["pch"]["units"].get(PCH_LANGUAGES.get(file[2]))
+	if pch is None or not pch["ready"]:
+		return None
+
+	includes = settings["deps_graph"]["forward"].get(f"{file[0]}/{file[1]}.{file[2]}")
+	if includes is None or not set(pch["includes"]).issubset(includes):
+		return None
+
+	return pch
+
+
+def build_pch(new_hashes: dict, settings: dict) -> list[dict]:
+	"""
+	(Re)builds the precompiled headers whose headers, or compiler arguments, changed
+	Returns the status of each build started
+	"""
+
+	import hashlib
+
+	oargs = settings["specifics"]
+	obj_dir = settings["objects_path"] + "/" + settings["profile"]
+	statuses: list[dict] = []
+
+	os.makedirs(f"{obj_dir}/{PCH_DIRNAME}", exist_ok=True)
+
+	for language, pch in settings["pch"]["units"].items():
+		header = pch["header"]
+		stub = header + (".c" if language == "c" else ".cpp")
+		content = "".join(f'#include "{os.path.abspath(x)}"\n' for x in pch["includes"])
+
+		command = f'{settings["compiler"]}{settings["cargs"]}{settings["includes"]} ' + oargs["pch_create"].format(header=header, language=language, stub=stub, object=pch["object"])
+
+		# anything in the headers, or in their includes, changes the precompiled one
+		fingerprint = hashlib.sha1(command.encode())
+		closure = set(pch["includes"])
+		for incl in pch["includes"]:
+			closure.update(get_includes(incl, settings))
+		for incl in sorted(closure):
+			digest = new_hashes[incl] if incl in new_hashes else get_new_hash(incl, None, new_hashes, settings)
+			fingerprint.update(f"\0{incl}\0{digest[0]}".encode())
+
+		try:
+			with open(header + ".stamp", "r") as f:
+				if f.read() == fingerprint.hexdigest() and os.path.exists(f'{header}.{oargs["pch_extension"]}'):
+					continue
+		except OSError:
+			pass
+
+		with open(header, "w") as f:
+			f.write(content)
+		with open(stub, "w") as f:
+			f.write("")
+
+		status = {
+		 "result": COMPILATION_STATUS_COMPILING,
+		 "name": settings["label"] + os.path.basename(header),
+		 "output": "",
+		 "errors": "",
+		 "command": command,
+		 "stamp": fingerprint.hexdigest(),
+		 "language": language
+		}
+		statuses.append(status)
+		log = get_log_path(os.path.basename(header), settings)
+		threading.Thread(target=exe_command, args=(command, status, settings["limiter"], settings["progress"], log)).start()
+
+	return statuses
+
+
+def get_compiler_identity(settings: dict) -> str:
+	"""
+	Returns a string that changes if the compiler executable changes, computed once per run
+	"""
+
+	import shutil
+
+	cache = settings["cache"]
+
+	with cache["lock"]:
+		if cache["compiler_id"] is None:
+			exe = shutil.which(settings["compiler"]) or settings["compiler"]
+			identity = exe
+
+			try:
+				stat = os.stat(exe)
+				identity += f":{stat.st_mtime_ns}:{stat.st_size}"
+
+				# msvc prints its banner on stderr
+				stream, out, err = cmd(settings["compiler"] + " --version")
+				identity += out + err
+			except OSError:
+				pass
+
+			cache["compiler_id"] = identity
+
+	return cache["compiler_id"]
+
+
+def get_cache_key(file: tuple[str, str, str], includes: list[str], new_hashes: dict, settings: dict) -> str:
+	"""
+	Returns the key of the cached object for the given source,
+	made from the compiler, its arguments and the content of the source and of its includes
+	"""
+
+	import hashlib
+
+	source = f"{file[0]}/{file[1]}.{file[2]}"
+
+	key = hashlib.sha256(get_compiler_identity(settings).encode())
+
+	# the whole command, precompiled header included, but not where it writes, that depends on the profile
+	key.update(b"\0" + get_compile_command(file, settings).replace(f'{settings["objects_path"]}/{settings["profile"]}/', "").encode())
+
+	# the order depends on who found the includes, the compiler or the scanner
+	for dep in [source] + sorted(includes):
+		digest = new_hashes[dep] if dep in new_hashes else get_new_hash(dep, None, new_hashes, settings)
+		key.update(f"\0{dep}\0{digest[0]}".encode())
+
+	return key.hexdigest()
+
+
+def write_dependencies(dep_file: str, obj: str, source: str, includes: list[str]) -> None:
+	"""
+	Write a dependency file like the compiler would have
+	"""
+
+	if dep_file.endswith(".json"):
+		data = json.dumps({"Version": "1.1", "Data": {"Source": source, "Includes": includes}})
+	else:
+		data = f"{obj}: " + " ".join(x.replace(" ", "\\ ") for x in [source] + includes) + "\n"
+
+	with open(dep_file, "w") as f:
+		f.write(data)
+
+
+def cache_fetch(key: str, file: tuple[str, str, str], settings: dict) -> dict | None:
+	"""
+	Copies the cached object, and its dependency file, in the objects directory
+	Returns the cached compiler output, None if the object is not cached
+	"""
+
+	oargs = settings["specifics"]
+	obj = f'{get_object_path(file, settings)}.{oargs["object_extension"]}'
+	entry = f'{settings["cache"]["dir"]}/{key[:2]}/{key}'
+
+	try:
+		with open(entry, "rb") as f:
+			header, data = f.read().split(b"\n", 1)
+		meta = json.loads(header)
+
+		if meta["compression"] == "zlib":
+			data = zlib.decompress(data)
+		elif meta["compression"] == "lzma":
+			import lzma
+			data = lzma.decompress(data)
+	except (OSError, ValueError, KeyError, ImportError, zlib.error):
+		return None
+
+	with open(obj + ".tmp", "wb") as f:
+		f.write(data)
+	os.replace(obj + ".tmp", obj)
+
+	write_dependencies(f'{get_object_path(file, settings)}.{oargs["dependency_extension"]}', obj, f"{file[0]}/{file[1]}.{file[2]}", meta["includes"])
+
+	# recently used, evicted last
+	os.utime(entry)
+
+	return meta
+
+
+def cache_store(key: str, file: tuple[str, str, str], status: dict, settings: dict) -> None:
+	"""
+	Puts the object just compiled in the cache
+	"""
+
+	oargs = settings["specifics"]
+	obj = f'{get_object_path(file, settings)}.{oargs["object_extension"]}'
+	compression = settings["cache"]["compression"]
+
+	includes = load_compiled_dependencies(file, settings)
+	if includes is None:
+		return
+
+	try:
+		with open(obj, "rb") as f:
+			data = f.read()
+
+		if compression == "zlib":
+			data = zlib.compress(data)
+		elif compression == "lzma":
+			import lzma
+			data = lzma.compress(data)
+	except (OSError, ImportError):
+		return
+
+	meta = {
+	 "compression": compression,
+	 "includes": includes,
+	 "output": status["output"],
+	 "errors": status["errors"]
+	}
+
+	entry = f'{settings["cache"]["dir"]}/{key[:2]}/{key}'
+	os.makedirs(os.path.dirname(entry), exist_ok=True)
+
+	with open(entry + ".tmp", "wb") as f:
+		f.write(json.dumps(meta).encode() + b"\n" + data)
+	os.replace(entry + ".tmp", entry)
+
+
+def trim_cache(settings: dict) -> None:
+	"""
+	Removes the least recently used objects until the cache is below its size limit
+	"""
+
+	entries: list[tuple[int, int, str]] = []
+	total = 0
+
+	for path, subdirs, files in os.walk(settings["cache"]["dir"]):
+		for name in files:
+			try:
+				stat = os.stat(f"{path}/{name}")
+			except OSError:
+				continue
+			entries.append((stat.st_mtime_ns, stat.st_size, f"{path}/{name}"))
+			total += stat.st_size
+
+	limit = settings["cache"]["size"] * 1024 * 1024
+	if total <= limit:
+		return
+
+	# some room, so it is not trimmed again on the next run
+	entries.sort()
+	for mtime, size, path in entries:
+		if total <= limit * 0.9:
+			break
+		try:
+			os.remove(path)
+			total -= size
+		except OSError:
+			pass
+
+
+def get_preprocessed_hash(file: tuple[str, str, str], settings: dict) -> str | None:
+	"""
+	Returns the hash of the preprocessed source, without comments, line markers, empty lines and indentation,
+	and of the command compiling it, the same source compiled with other args is not the same object
+	None if the preprocessor fails
+	"""
+
+	import hashlib
+	import subprocess
+
+	oargs = settings["specifics"]
+	command = f'{settings["compiler"]}{settings["cargs"]}{settings["includes"]} {oargs["preprocess_only"]} {file[0]}/{file[1]}.{file[2]}'
+
+	digest = hashlib.sha1()
+	digest.update(get_compile_command(file, settings).encode() + b"\n")
+
+	acquire_slot(settings["limiter"])
+
+	try:
+		# read line by line, a preprocessed file can be quite big
+		stream = subprocess.Popen(command.split(" "), stderr=subprocess.DEVNULL, stdout=subprocess.PIPE, universal_newlines=True, **get_process_group_args())
+		register_process(settings["limiter"], stream)
+		for line in stream.stdout:
+			line = line.strip()
+			if line and not line.startswith("#line") and not line.startswith("# "):
+				digest.update(line.encode() + b"\n")
+		stream.wait()
+		terminated = unregister_process(settings["limiter"], stream)
+	except OSError:
+		return None
+	finally:
+		release_slot(settings["limiter"])
+
+	if terminated or stream.returncode != 0:
+		return None
+
+	return digest.hexdigest()
+
+
+def parse_address(address: str) -> tuple[str, int]:
+	"""
+	"host:port" -> ("host", port), "port" -> ("127.0.0.1", port)
+	"""
+
+	if ":" not in address:
+		return "127.0.0.1", int(address)
+
+	host, port = address.rsplit(":", 1)
+	return host, int(port)
+
+
+def is_loopback(host: str) -> bool:
+	return host == "localhost" or host == "::1" or host.startswith("127.")
+
+
+def is_worker_arg_allowed(arg: str) -> bool:
+	"""
+	Returns if a worker can pass the argument to the compiler, only the ones changing the code generated and the diagnostics are
+	"""
+
+	if any(arg.startswith(x) for x in WORKER_FORBIDDEN_F_ARGS):
+		return False
+
+	return any(re.fullmatch(x, arg) for x in WORKER_ALLOWED_ARGS)
+
+
+def recv_exactly(sock: socket.socket, size: int) -> bytes:
+	data = b""
+	while len(data) < size:
+		chunk = sock.recv(min(size - len(data), 1 << 20))
+		if not chunk:
+			raise ConnectionError("connection closed")
+		data += chunk
+	return data
+
+
+def send_message(sock: socket.socket, header: dict, payload: bytes = b"") -> None:
+	"""
+	A message is the length of the json header, the header, the length of the payload, the payload
+	"""
+
+	data = json.dumps(header).encode()
+	sock.sendall(struct.pack("!I", len(data)) + data + struct.pack("!Q", len(payload)) + payload)
+
+
+def recv_message(sock: socket.socket) -> tuple[dict, bytes]:
+	header = json.loads(recv_exactly(sock, struct.unpack("!I", recv_exactly(sock, 4))[0]))
+	payload = recv_exactly(sock, struct.unpack("!Q", recv_exactly(sock, 8))[0])
+	return header, payload
+
+
+def get_compiler_version(compiler: str) -> str:
+	"""
+	The same version on the coordinator and on the worker makes the same objects
+	"""
+
+	try:
+		stream, out, err = cmd(compiler + " --version")
+	except OSError:
+		return ""
+
+	return out.split("\n")[0]
+
+
+def choose_worker(workers: dict) -> tuple[str, int] | None:
+	"""
+	Returns the worker with less jobs running, among the ones not failed recently
+	"""
+
+	now = time.monotonic()
+
+	with workers["lock"]:
+		available = [x for x in workers["hosts"] if workers["failed"].get(x, 0) <= now]
+		if not available:
+			return None
+
+		worker = min(available, key=lambda x: workers["jobs"].get(x, 0))
+		workers["jobs"][worker] = workers["jobs"].get(worker, 0) + 1
+
+	return worker
+
+
+def compile_remote(file: tuple[str, str, str], status: dict, settings: dict) -> bool:
+	"""
+	Preprocess the source, and compile it on a worker
+	returns False if it could not be compiled remotely, and needs to be compiled here
+	"""
+
+	import socket
+	import subprocess
+
+	oargs = settings["specifics"]
+	workers = settings["workers"]
+	language = PCH_LANGUAGES.get(file[2])
+
+	if language is None or not oargs["preprocess_remote"]:
+		return False
+
+	obj_path = get_object_path(file, settings)
+	obj = f'{obj_path}.{oargs["object_extension"]}'
+	preprocessed = f"{obj_path}.{REMOTE_EXTENSIONS[language]}"
+
+	colors = oargs["force_colors"] if settings["printing"]["colors"] else oargs["no_colors"]
+	with workers["lock"]:
+		if settings["compiler"] not in workers["versions"]:
+			workers["versions"][settings["compiler"]] = get_compiler_version(settings["compiler"])
+
+	# the worker finds the compiler in its own path
+	request = {
+	 "token": os.environ.get(WORKER_TOKEN_VARIABLE, ""),
+	 "compiler": os.path.basename(settings["compiler"]),
+	 "version": workers["versions"][settings["compiler"]],
+	 "args": (settings["cargs"] + " " + colors).split(),
+	 "extension": REMOTE_EXTENSIONS[language]
+	}
+
+	acquire_slot(settings["limiter"])
+
+	try:
+		start = time.monotonic()
+
+		# the compiler records the includes while preprocessing
+		flags = oargs["preprocess_remote"].format(dep=f'{obj_path}.{oargs["dependency_extension"]}', obj=obj, output=preprocessed)
+		stream = subprocess.Popen(f'{settings["compiler"]}{settings["cargs"]}{settings["includes"]} {flags} {file[0]}/{file[1]}.{file[2]}'.split(" "), stderr=subprocess.DEVNULL, stdout=subprocess.DEVNULL, **get_process_group_args())
+		register_process(settings["limiter"], stream)
+		stream.wait()
+
+		# the local compiler will report the errors, or see the build cancelled
+		if unregister_process(settings["limiter"], stream) or stream.returncode != 0:
+			return False
+
+		with open(preprocessed, "rb") as f:
+			payload = zlib.compress(f.read())
+		os.remove(preprocessed)
+
+		for attempt in range(len(workers["hosts"])):
+			worker = choose_worker(workers)
+			if worker is None:
+				break
+
+			try:
+				with socket.create_connection(worker, timeout=WORKER_TIMEOUT) as sock:
+					send_message(sock, request, payload)
+					header, data = recv_message(sock)
+
+				if "refused" in header:
+					raise ValueError(header["refused"])
+
+				if header["returncode"] == 0:
+					with open(obj + ".tmp", "wb") as f:
+						f.write(zlib.decompress(data))
+					os.replace(obj + ".tmp", obj)
+
+			except (OSError, ValueError, KeyError, zlib.error):
+				# try another one, this one is left alone for a while
+				with workers["lock"]:
+					workers["failed"][worker] = time.monotonic() + WORKER_RETRY_DELAY
+				continue
+
+			finally:
+				with workers["lock"]:
+					workers["jobs"][worker] -= 1
+
+			with settings["progress"]:
+				workers["remote"] += 1
+				status["command"] += f" (on {worker[0]}:{worker[1]})"
+				status["output"] = header["output"]
+				status["errors"] = header["errors"]
+				status["duration"] = time.monotonic() - start
+				status["result"] = COMPILATION_STATUS_DONE if header["returncode"] == 0 else COMPILATION_STATUS_FAILED
+				settings["progress"].notify_all()
+
+			return True
+
+		with workers["lock"]:
+			workers["local"] += 1
+
+		return False
+
+	except OSError:
+		return False
+
+	finally:
+		release_slot(settings["limiter"])
+
+
+def run_worker_job(conn: socket.socket, limiter: dict, versions: dict[str, str], token: str) -> None:
+	"""
+	Compiles the preprocessed source received, and sends back the object and the compiler output
+	"""
+
+	import hmac
+	import subprocess
+	import tempfile
+
+	with conn:
+		try:
+			conn.settimeout(WORKER_TIMEOUT)
+			request, payload = recv_message(conn)
+
+			if not hmac.compare_digest(str(request.get("token", "")).encode(), token.encode()):
+				send_message(conn, {"refused": "wrong token"})
+				return
+
+			compiler = request["compiler"]
+			args = [str(x) for x in request["args"]]
+			extension = request["extension"]
+
+			if compiler not in WORKER_COMPILERS or extension not in REMOTE_EXTENSIONS.values():
+				send_message(conn, {"refused": f"{compiler} not allowed"})
+				return
+
+			refused = [x for x in args if not is_worker_arg_allowed(x)]
+			if refused:
+				send_message(conn, {"refused": f"arguments not allowed: {' '.join(refused)}"})
+				return
+
+			if compiler not in versions:
+				versions[compiler] = get_compiler_version(compiler)
+			if versions[compiler] != request["version"]:
+				send_message(conn, {"refused": f"different compiler version: {versions[compiler]}"})
+				return
+
+			acquire_slot(limiter)
+			try:
+				with tempfile.TemporaryDirectory() as directory:
+					with open(f"{directory}/unit.{extension}", "wb") as f:
+						f.write(zlib.decompress(payload))
+
+					stream = subprocess.run([compiler] + args + ["-c", f"{directory}/unit.{extension}", "-o", f"{directory}/unit.o"], capture_output=True, universal_newlines=True)
+
+					data = b""
+					if stream.returncode == 0:
+						with open(f"{directory}/unit.o", "rb") as f:
+							data = zlib.compress(f.read())
+			finally:
+				release_slot(limiter)
+
+			send_message(conn, {"returncode": stream.returncode, "output": stream.stdout, "errors": stream.stderr}, data)
+			print(f" {'+' if stream.returncode == 0 else '-'} {conn.getpeername()[0]}: {len(payload)} bytes compiled")
+
+		except (OSError, ValueError, KeyError, zlib.error) as e:
+			print(f"{COLS.FG_RED} - failed job: {e}{COLS.RESET}")
+
+
+def run_worker(address: str, limiter: dict) -> None:
+	"""
+	Compiles the sources sent by the coordinators, until stopped
+	"""
+
+	import socket
+
+	host, port = parse_address(address)
+	versions: dict[str, str] = {}
+
+	# anyone who can connect can make the worker compile
+	token = os.environ.get(WORKER_TOKEN_VARIABLE, "")
+	if not token and not is_loopback(host):
+		print(f"{COLS.FG_RED}A worker listening on {host} needs a token in the {WORKER_TOKEN_VARIABLE} environment variable{COLS.RESET}")
+		exit(1)
+
+	server = socket.create_server((host, port))
+	print(f"{COLS.FG_GREEN} --- Worker listening on {host}:{port}, {limiter['base']} jobs at a time ---{COLS.RESET}")
+
+	try:
+		while True:
+			conn, _ = server.accept()
+			threading.Thread(target=run_worker_job, args=(conn, limiter, versions, token), daemon=True).start()
+	except KeyboardInterrupt:
+		print(f"\n{COLS.FG_YELLOW} --- Worker stopped ---{COLS.RESET}")
+	finally:
+		server.close()
+
+
+def compile_unit(file: tuple[str, str, str], command: str, status: dict, new_hashes: dict, settings: dict) -> None:
+	"""
+	Skips the compilation if the preprocessed source did not change,
+	takes the object from the cache if possible, compiles it and caches it otherwise
+	"""
+
+	cache = settings["cache"]
+	source = f"{file[0]}/{file[1]}.{file[2]}"
+
+	if settings["limiter"]["cancelled"]:
+		set_cancelled(status, settings["progress"])
+		return
+
+	objects = settings["objects"].setdefault(source, {"command": None, "preprocessed": None})
+	preprocessed = None
+
+	if settings["preprocessed_check"]:
+		preprocessed = get_preprocessed_hash(file, settings)
+		obj = f'{get_object_path(file, settings)}.{settings["specifics"]["object_extension"]}'
+
+		# only comments or whitespaces changed, the object is still good
+		if preprocessed is not None and preprocessed == objects["preprocessed"] and os.path.exists(obj):
+			with settings["progress"]:
+				status["command"] += " (unchanged)"
+				status["result"] = COMPILATION_STATUS_DONE
+				settings["progress"].notify_all()
+			return
+
+	# the digest describes the object about to be written, none if it was not computed or the object is not written
+	objects["preprocessed"] = None
+
+	if cache["enabled"]:
+		key = get_cache_key(file, get_unit_includes(file, False, settings), new_hashes, settings)
+		meta = cache_fetch(key, file, settings)
+
+		if meta is not None:
+			objects["preprocessed"] = preprocessed
+			with settings["progress"]:
+				cache["hits"] += 1
+				status["command"] += " (cached)"
+				status["output"] = meta["output"]
+				status["errors"] = meta["errors"]
+				status["result"] = COMPILATION_STATUS_DONE
+				settings["progress"].notify_all()
+			return
+
+	if not (settings["workers"]["hosts"] and compile_remote(file, status, settings)):
+		exe_command(command, status, settings["limiter"], settings["progress"], get_log_path(get_object_name(file), settings))
+
+	if status["result"] == COMPILATION_STATUS_FAILED:
+		add_failure(settings)
+
+	if status["result"] == COMPILATION_STATUS_DONE:
+		objects["preprocessed"] = preprocessed
+		with settings["progress"]:
+			settings["durations"]["measured"][source] = status["duration"]
+
+	if not cache["enabled"]:
+		return
+
+	with cache["lock"]:
+		cache["misses"] += 1
+
+	if status["result"] == COMPILATION_STATUS_DONE:
+		# the includes the compiler just found, the previous ones might be outdated
+		includes = get_unit_includes(file, True, settings)
+		if includes is not None:
+			cache_store(get_cache_key(file, includes, new_hashes, settings), file, status, settings)
+
+			with cache["lock"]:
+				cache["stored"] += 1
+
+
+def make_unity_batches(source_files: list[str], settings: dict) -> None:
+	"""
+	Groups the sources in batches of about settings["unity"]["size"] sources, of the same directory and language
+	The batches depend only on the sources present, not on the ones modified, so they are the same from one run to the next
+	"""
+
+	unity = settings["unity"]
+	groups: dict[tuple[str, str], list[str]] = {}
+
+	for file in source_files:
+		fname = parse_file_path(file)
+		language = PCH_LANGUAGES.get(fname[2])
+
+		if language is None or any(fnmatch.fnmatch(file, x) for x in unity["exclude"]):
+			continue
+
+		groups.setdefault((fname[0], language), []).append(file)
+
+	unity["batches"] = {}
+	unity["of"] = {}
+
+	for (directory, language), files in sorted(groups.items()):
+		files.sort()
+		ext = "c" if language == "c" else "cpp"
+
+		for i in range(0, len(files), unity["size"]):
+			batch = f'{unity["dir"]}/{"".join(directory.split("/"))}_{language}_{i // unity["size"]}.{ext}'
+			unity["batches"][batch] = files[i:i + unity["size"]]
+
+			for file in unity["batches"][batch]:
+				unity["of"][file] = batch
+
+
+def get_unity_units(to_compile: list[tuple[str, str, str]], settings: dict) -> tuple[list[tuple[str, str, str]], list[tuple[str, str, str]]]:
+	"""
+	Replaces the sources to compile that are in a unity batch with their batch
+	Returns the units to actually compile and all the sources that will be compiled with them
+	"""
+
+	unity = settings["unity"]
+	oargs = settings["specifics"]
+	units: list[tuple[str, str, str]] = []
+	sources: list[tuple[str, str, str]] = []
+
+	dirty: set[str] = set()
+	for file in to_compile:
+		batch = unity["of"].get(f"{file[0]}/{file[1]}.{file[2]}")
+		if batch is None:
+			units.append(file)
+			sources.append(file)
+		else:
+			dirty.add(batch)
+
+	os.makedirs(unity["dir"], exist_ok=True)
+
+	for batch, files in unity["batches"].items():
+		# relative, so the compiler reports them as the project knows them
+		content = "".join(f'#include "{os.path.relpath(x, unity["dir"])}"\n'.replace("\\", "/") for x in files)
+
+		try:
+			with open(batch, "r") as f:
+				old_content = f.read()
+		except OSError:
+			old_content = None
+
+		# a source added or removed changes the batch too
+		if content != old_content:
+			with open(batch, "w") as f:
+				f.write(content)
+			dirty.add(batch)
+		elif not os.path.exists(f'{get_object_path(parse_file_path(batch), settings)}.{oargs["object_extension"]}'):
+			dirty.add(batch)
+
+		if batch in dirty:
+			units.append(parse_file_path(batch))
+			sources += [parse_file_path(x) for x in files]
+
+	return units, sources
+
+
+def compile(builds: list[dict], compilations: list[dict]) -> None:
+	"""
+	Calls the compiler with the specified arguments, for the units of every build
+	"""
+
+	# the longest first, so that no long compilation is started when the others are done
+	# a link waits for every unit of its build, so the longest first is also the critical path first
+	work: list[tuple[float, tuple[str, str, str], dict]] = []
+	for job in builds:
+		estimates = estimate_durations(job["units"], job["settings"])
+		work += [(estimates[x], x, job) for x in job["units"]]
+
+	# a fixed pool takes the units from the queue, so they start in this order whatever the threads do
+	queue: list[tuple[float, int, tuple[str, str, str], dict, str, dict]] = []
+
+	for i, (estimate, file, job) in enumerate(work):
+		settings = job["settings"]
+		oargs = settings["specifics"]
+		colors = oargs["force_colors"] if settings["printing"]["colors"] else oargs["no_colors"]
+
+		command = get_compile_command(file, settings, colors)
+
+		result = {
+		 "result": COMPILATION_STATUS_COMPILING,
+		 "name": f'{settings["label"]}{file[1]}.{file[2]}',
+		 "output": "",
+		 "errors": "",
+		 "command": command,
+		 "file": file
+		}
+		compilations.append(result)
+		job["statuses"].append(result)
+		heapq.heappush(queue, (-estimate, i, file, job, command, result))
+
+	lock = threading.Lock()
+	for _ in range(min(len(queue), builds[0]["settings"]["limiter"]["base"])):
+		threading.Thread(target=compile_queued, args=(queue, lock)).start()
+
+
+def compile_queued(queue: list, lock: threading.Lock) -> None:
+	"""
+	Compiles the units of the queue, the longest first, until there are none left
+	"""
+
+	while True:
+		with lock:
+			if not queue:
+				return
+			_, _, file, job, command, result = heapq.heappop(queue)
+
+		compile_unit(file, command, result, job["new_hashes"], job["settings"])
+
+
+def get_source_weight(source: str, settings: dict) -> int:
+	"""
+	Returns the size of the source plus a fixed weight for each of its includes, a rough measure of the work to compile it
+	"""
+
+	try:
+		size = os.path.getsize(source)
+	except OSError:
+		size = 0
+
+	return size + DURATION_INCLUDE_WEIGHT * len(settings["deps_graph"]["forward"].get(source, []))
+
+
+def estimate_durations(to_compile: list[tuple[str, str, str]], settings: dict) -> dict[tuple[str, str, str], float]:
+	"""
+	Returns the seconds each unit is expected to take, the time it took to compile the last times
+	the ones never compiled get an estimate from their weight, scaled as the ones already compiled
+	"""
+
+	known = settings["durations"]["known"]
+	batches = settings["unity"]["batches"]
+
+	weights: dict[tuple[str, str, str], int] = {}
+	for file in to_compile:
+		source = f"{file[0]}/{file[1]}.{file[2]}"
+		weights[file] = sum(get_source_weight(x, settings) for x in batches.get(source, [source]))
+
+	# seconds per unit of weight of the units compiled before
+	rates = sorted(known[f"{x[0]}/{x[1]}.{x[2]}"] / weights[x] for x in to_compile if f"{x[0]}/{x[1]}.{x[2]}" in known and weights[x] > 0)
+	rate = rates[len(rates) // 2] if rates else 1.0
+
+	return {x: known.get(f"{x[0]}/{x[1]}.{x[2]}", weights[x] * rate) for x in to_compile}
+
+
+def load_durations(state: sqlite3.Connection) -> dict[str, float]:
+	"""
+	Load the seconds each unit took to compile
+	"""
+
+	return dict(state.execute("SELECT source, seconds FROM durations"))
+
+
+def save_durations(settings: dict, state: sqlite3.Connection) -> None:
+	"""
+	Record the seconds each unit compiled in this run took, smoothed with the previous records
+	"""
+
+	known = settings["durations"]["known"]
+
+	for source, seconds in settings["durations"]["measured"].items():
+		known[source] = seconds if source not in known else DURATION_SMOOTHING * seconds + (1 - DURATION_SMOOTHING) * known[source]
+
+	with state:
+		state.executemany("INSERT OR REPLACE INTO durations VALUES (?, ?)", [(x, known[x]) for x in settings["durations"]["measured"]])
+
+
+def add_timing(phase: str, start: float, settings: dict) -> None:
+	"""
+	Record the seconds passed since start as the time spent in the given phase
+	"""
+
+	settings["timings"]["phases"][phase] = time.monotonic() - start
+
+
+def save_timings(settings: dict, state: sqlite3.Connection, result: str) -> None:
+	"""
+	Append the phases of this run, its result, and the time of each unit compiled, to the timings history
+	only the last TIMINGS_HISTORY runs are kept
+	"""
+
+	timings = settings["timings"]
+
+	with state:
+		run = state.execute("INSERT INTO runs (started, threads, result) VALUES (?, ?, ?)", (time.time(), timings["threads"], result)).lastrowid
+
+		rows = [(run, "phase", name, seconds) for name, seconds in timings["phases"].items()]
+		rows += [(run, "unit", name, seconds) for name, seconds in settings["durations"]["measured"].items()]
+		state.executemany("INSERT INTO timings VALUES (?, ?, ?, ?)", rows)
+
+		state.execute("DELETE FROM timings WHERE run <= ?", (run - TIMINGS_HISTORY, ))
+		state.execute("DELETE FROM runs WHERE id <= ?", (run - TIMINGS_HISTORY, ))
+
+
+def median(values: list[float]) -> float:
+	values = sorted(values)
+	return values[len(values) // 2]
+
+
+def print_timing_report(state: sqlite3.Connection) -> None:
+	"""
+	Prints the slowest units, the phases of the last runs with their parallel efficiency,
+	and what got slower than the median of the previous runs
+	"""
+
+	runs = state.execute("SELECT id, started, threads, result FROM runs ORDER BY id DESC LIMIT ?", (REPORT_RUNS + 1, )).fetchall()[::-1]
+
+	if not runs:
+		print(f"{COLS.FG_YELLOW} --- No build recorded for this profile ---{COLS.RESET}")
+		return
+
+	# run -> kind -> name -> seconds
+	history: dict[int, dict[str, dict[str, float]]] = {x[0]: {"phase": {}, "unit": {}} for x in runs}
+	for run, kind, name, seconds in state.execute("SELECT run, kind, name, seconds FROM timings WHERE run >= ?", (runs[0][0], )):
+		history[run][kind][name] = seconds
+
+	# --- Slowest units ---
+
+	print(COLS.FG_GREEN, " --- Slowest units ---", COLS.RESET)
+
+	last_unit: dict[str, float] = {}
+	for run, _, _, _ in runs:
+		last_unit.update(history[run]["unit"])
+
+	for name, seconds in sorted(last_unit.items(), key=lambda x: x[1], reverse=True)[:REPORT_SLOWEST]:
+		print(f"  {seconds:8.2f}s  {name}")
+
+	# --- Runs ---
+
+	print("\n", COLS.FG_GREEN, " --- Last runs ---", COLS.RESET)
+
+	phases = [x for x in REPORT_PHASES if any(x in history[run]["phase"] for run, _, _, _ in runs)]
+	print(f'{COLS.FG_LIGHT_BLACK}  {"date":16}  {"result":10}  {"units":>5}  ' + "  ".join(f"{x:>11}" for x in phases) + f'  {"efficiency":>10}{COLS.RESET}')
+
+	for run, started, threads, result in runs:
+		phase = history[run]["phase"]
+		units = history[run]["unit"]
+
+		# share of the compile phase the threads were busy compiling
+		efficiency = ""
+		if phase.get("compile") and units:
+			width = min(threads, len(units))
+			efficiency = f'{100 * sum(units.values()) / (phase["compile"] * width):.0f}% of {width}'
+
+		print(f'  {time.strftime("%Y-%m-%d %H:%M", time.localtime(started))}  {result or "":10}  {len(units):5}  ' + "  ".join(f"{phase[x]:10.2f}s" if x in phase else f'{"":11}' for x in phases) + f"  {efficiency:>10}")
 
+	# --- Regressions ---
 
-def make_new_file_hash(file: str) -> str:
+	print("\n", COLS.FG_GREEN, " --- Regressions ---", COLS.RESET)
+
+	last = history[runs[-1][0]]
+	found = False
+
+	for kind in ["phase", "unit"]:
+		for name, seconds in last[kind].items():
+			# the runs stopped early would make any run look slower
+			previous = [history[run][kind][name] for run, _, _, result in runs[:-1] if name in history[run][kind] and result not in ["failed", "cancelled"]]
+			if not previous:
+				continue
+
+			med = median(previous)
+			if med > 0 and seconds > med * REPORT_REGRESSION and seconds - med > 0.1:
+				found = True
+				print(f"{COLS.FG_RED}  {name}: {seconds:.2f}s, median {med:.2f}s (+{100 * (seconds - med) / med:.0f}%){COLS.RESET}")
+
+	if not found:
+		print("  none")
+
+
+def get_link_objects(settings: dict) -> list[str]:
 	"""
-	Calculate the hash for the given file an puts it in the new_hashes file
+	Returns the objects of the current sources, the ones to link
 	"""
-	# i need to re-instantiate the object to empty it
-	sha1 = hashlib.sha1()
 
+	objects: dict[str, None] = {}
+
+	for file in settings["source_files"]:
+		objects[get_source_object(parse_file_path(file), settings)] = None
+
+	# msvc puts the code of the precompiled header in an object of its own
+	if settings["pch"]["enabled"]:
+		for pch in settings["pch"]["units"].values():
+			if pch["ready"] and os.path.exists(pch["object"]):
+				objects[pch["object"]] = None
+
+	return list(objects)
+
+
+def get_link_fingerprint(objects: list[str], settings: dict) -> str:
+	"""
+	Returns an hash of the link arguments, of the stats of the objects to link, and of the executable
+	other profiles can link the same executable
+	"""
+
+	import hashlib
+
+	oargs = settings["specifics"]
+	fingerprint = hashlib.sha1(f'{settings["linker"]}{settings["largs"]} {oargs["output_linker"]}{settings["exe_path_name"]}{settings["libraries_paths"]}{settings["libraries_names"]}'.encode())
+
+	epn = settings["exe_path_name"]
+
+	for obj in objects + [epn, epn + ".exe"]:
+		try:
+			st = os.stat(obj)
+			fingerprint.update(f"\0{obj}\0{st.st_mtime_ns}\0{st.st_size}".encode())
+		except OSError:
+			fingerprint.update(f"\0{obj}\0".encode())
+
+	return fingerprint.hexdigest()
+
+
+def to_relink(objects: list[str], settings: dict) -> bool:
+	"""
+	True if the objects, the link arguments or the executable changed since the last successful link
+	"""
+
+	return get_link_fingerprint(objects, settings) != settings["link"]["fingerprint"]
+
+
+def load_link_fingerprint(target: str, state: sqlite3.Connection) -> str | None:
+	"""
+	Load the fingerprint of the last successful link of target
+	"""
+
+	row = state.execute("SELECT fingerprint FROM links WHERE target = ?", (target, )).fetchone()
+
+	return None if row is None else row[0]
+
+
+def save_link_fingerprint(target: str, fingerprint: str | None, state: sqlite3.Connection) -> None:
+	"""
+	Record the fingerprint of the last successful link of target
+	"""
+
+	if fingerprint is None:
+		return
+
+	with state:
+		state.execute("INSERT OR REPLACE INTO links VALUES (?, ?)", (target, fingerprint))
+
+
+def remove_orphan_objects(objects: list[str], settings: dict) -> None:
+	"""
+	Delete the objects, and their dependency and log files, of sources that do not exist anymore
+	and the unity sources of batches that do not exist anymore
+	"""
+
+	oargs = settings["specifics"]
+	obj_dir = settings["objects_path"] + "/" + settings["profile"]
+	unity_dir = settings["unity"]["dir"]
+	live = set(objects)
+
+	for directory in [obj_dir, unity_dir]:
+		try:
+			entries = os.listdir(directory)
+		except OSError:
+			continue
+
+		for name in entries:
+			path = f"{directory}/{name}"
+			file = parse_file_path(path)
+
+			if file[2] == oargs["object_extension"]:
+				if path in live:
+					continue
+
+			elif directory == unity_dir and file[2] in SOURCE_FILES_EXTENSIONS:
+				if path in settings["unity"]["batches"]:
+					continue
+
+			else:
+				continue
+
+			log = get_log_path(file[1], settings)
+			for orphan in [path, f'{file[0]}/{file[1]}.{oargs["dependency_extension"]}', f"{log}.output.log", f"{log}.errors.log"]:
+				if os.path.exists(orphan):
+					os.remove(orphan)
+
+
+def remove_partial_objects(job: dict) -> None:
+	"""
+	Deletes the objects a terminated compiler might have half written,
+	and forgets the hashes of their sources, so that the next build compiles them even if they did not change
+	"""
+
+	settings = job["settings"]
+	oargs = settings["specifics"]
+	forgotten: list[str] = []
+
+	for status in job["statuses"]:
+		if not status.get("terminated"):
+			continue
+
+		file = status["file"]
+		obj_path = get_object_path(file, settings)
+		for partial in [f'{obj_path}.{oargs["object_extension"]}', f'{obj_path}.{oargs["dependency_extension"]}']:
+			if os.path.exists(partial):
+				os.remove(partial)
+
+		forgotten.append(f"{file[0]}/{file[1]}.{file[2]}")
+
+	for source in forgotten:
+		job["old_hashes"].pop(source, None)
+
+	with job["state"]:
+		job["state"].executemany("DELETE FROM files WHERE path = ?", [[x] for x in forgotten])
+
+
+def link(objects: list[str], settings: dict, status: dict) -> None:
+	"""
+	Link together the given objects with the specified libraries and arguments
+	long lists of objects are passed in a response file
+	"""
+
+	lexe = settings["linker"]
+	largs = settings["largs"]
+	epn = settings["exe_path_name"]
+	libs = settings["libraries_paths"]
+	obj_dir = settings["objects_path"] + "/" + settings["profile"]
+	oargs = settings["specifics"]
+
+	command = f'{lexe}{largs} {oargs["output_linker"]}{epn}{libs}'
+
+	quoted = [f'"{x}"' if " " in x else x for x in objects]
+
+	if sum(len(x) + 1 for x in quoted) > LINK_RESPONSE_THRESHOLD:
+		with open(f"{obj_dir}/{LINK_RESPONSE_FILENAME}", "w") as f:
+			f.write("\n".join(quoted))
+		quoted = [f'{oargs["response_file"]}{obj_dir}/{LINK_RESPONSE_FILENAME}']
+
+	for obj in quoted:
+		command += f" {obj}"
+
+	command += settings["libraries_names"]
+
+	status["name"] = settings["label"] + epn
+	status["command"] = command
+	log = get_log_path("_link", settings)
+	threading.Thread(target=exe_command, args=(command, status, settings["limiter"], settings["progress"], log)).start()
+
+
+def exe_script(name: str, settings: dict):
+	nm = settings["scripts"][name]
+	result = {
+	 "result": COMPILATION_STATUS_COMPILING,
+	 "name": nm,
+	 "output": "",
+	 "errors": "",
+	 "command": nm
+	}
+	start = time.monotonic()
+	log = get_log_path(f"_{name}_script", settings)
+	threading.Thread(target=exe_command, args=(f'./{nm}', result, settings["limiter"], settings["progress"], log)).start()
+	print_progress([result], settings)
+	add_timing(f"{name}_script", start, settings)
+	print("")
+	print_report([result], settings)
+
+
+def get_all_profiles() -> list[str]:
+
+	config = load_config()
+	if config is None:
+		return []
+
+	return list(config["names"])
+
+
+def create_makefile():
+	"""
+	Writes a Makefile with a rule for each object, whose includes make reads from the dependency files written by the compiler,
+	the variables of each profile refer to the default ones unless the profile overrides them
+	"""
+
+	profiles = get_all_profiles()
+
+	if len(profiles) == 0:
+		print(f"{COLS.FG_RED}At least one profile is needed in the config_file, but none found{COLS.RESET}")
+		return
+
+	# default has a target too, the last one so the profiles named in the config are the ones linking their executable
+	if "default" in profiles:
+		profiles.remove("default")
+	profiles.append("default")
+
+	# the profiles as the builder resolved them
+	settings = parse_config_json("default")
+	resolved = load_config()["profiles"]
+
+	os.chdir(settings["project_path"])
+
+	sources = [parse_file_path(x) for x in discover_sources(settings)]
+
+	oargs = settings["specifics"]
+
+	# gcc like compilers write the includes of each object next to it, -MP keeps make going when a header is deleted
+	deps = "-MMD -MP " if oargs["dependency_extension"] == "d" else ""
+
+	# variable, key in the config file, key in the resolved profile
+	variables: list[tuple[str, str, str]] = [
+	 ("CARGS", "compiler_args", "cargs"),
+	 ("LARGS", "linker_args", "largs"),
+	 ("LIBPATH", "libraries_dirs", "libraries_paths"),
+	 ("LIBNAMES", "libraries_names", "libraries_names"),
+	 ("BINNAME", "exe_path_name", "exe_path_name"),
+	]
+
+	make_file = "# generated by cpp_builder.py from cpp_builder_config.json\n"
+	make_file += "\n"
+
+	make_file += f"CC       = {settings['compiler']}\n"
+	make_file += f"LD       = {settings['linker']}\n"
+	make_file += f"OBJSDIR  = {settings['objects_path']}\n"
+	make_file += f"INCLUDES ={settings['includes']}\n"
+
+	make_file += "\n"
+
+	for var, _, key in variables:
+		make_file += f"DEFAULT-{var} = {resolved['default'][key].strip()}\n"
+
+	make_file += "\n"
+
+	make_file += f".DEFAULT_GOAL := {profiles[0]}\n"
+	make_file += "\n"
+
+	# no implicit rule fires
+	make_file += ".SUFFIXES:\n"
+
+	make_file += "\n\n"
+
+	phony: list[str] = []
+	linked: dict[str, str] = {}
+
+	for prof in profiles:
+		PROF = prof.upper()
+		profile = resolved.get(prof, resolved["default"])
+
+		make_file += f"# --- {prof} ---\n"
+		make_file += "\n"
+
+		# the variables of default are the DEFAULT- ones already written
+		if prof != "default":
+			for var, raw_key, key in variables:
+				if raw_key in profile["overrides"]:
+					make_file += f"{PROF}-{var} = {profile[key].strip()}\n"
+				else:
+					make_file += f"{PROF}-{var} = $(DEFAULT-{var})\n"
+
+			make_file += "\n"
+
+		make_file += f"{PROF}-OBJS = \\\n"
+		for file in sources:
+			make_file += f"	$(OBJSDIR)/{prof}/{get_object_name(file)}.{oargs['object_extension']} \\\n"
+
+		make_file += "\n"
+
+		make_file += f"-include $({PROF}-OBJS:.{oargs['object_extension']}=.{oargs['dependency_extension']})\n"
+
+		make_file += "\n"
+
+		# the objects wait for the directory and the pre script, without being rebuilt every time they change
+		order_only = f"$(OBJSDIR)/{prof}"
+		if profile["scripts"]["pre"] != "":
+			order_only += f" {prof}-pre"
+			phony.append(f"{prof}-pre")
+
+			make_file += f"{prof}-pre:\n"
+			make_file += f"	./{profile['scripts']['pre']}\n"
+			make_file += "\n"
+
+		make_file += f"$(OBJSDIR)/{prof}:\n"
+		make_file += "	mkdir -p $@\n"
+		make_file += "\n"
+
+		for file in sources:
+			make_file += f"$(OBJSDIR)/{prof}/{get_object_name(file)}.{oargs['object_extension']}: {file[0]}/{file[1]}.{file[2]} | {order_only}\n"
+			make_file += f"	$(CC) $({PROF}-CARGS) $(INCLUDES) {deps}{oargs['compile_only']} {oargs['output_compiler']}$@ $<\n"
+
+		make_file += "\n"
+
+		# a target has a single recipe, the others link it every time they are made
+		exe = profile["exe_path_name"]
+		if exe in linked:
+			make_file += f"{prof}: $({PROF}-OBJS)\n"
+			make_file += f"	@mkdir -p $(dir $({PROF}-BINNAME))\n"
+			make_file += f"	$(LD) $({PROF}-LARGS) {oargs['output_linker']}$({PROF}-BINNAME) $({PROF}-LIBPATH) $^ $({PROF}-LIBNAMES)\n"
+		else:
+			linked[exe] = prof
+			make_file += f"$({PROF}-BINNAME): $({PROF}-OBJS)\n"
+			make_file += "	@mkdir -p $(dir $@)\n"
+			make_file += f"	$(LD) $({PROF}-LARGS) {oargs['output_linker']}$@ $({PROF}-LIBPATH) $^ $({PROF}-LIBNAMES)\n"
+			make_file += "\n"
+			make_file += f"{prof}: $({PROF}-BINNAME)\n"
+
+		if profile["scripts"]["post"] != "":
+			make_file += f"	./{profile['scripts']['post']}\n"
+
+		phony.append(prof)
+
+		make_file += "\n\n"
+
+	make_file += "# --- clean ---\n"
+	make_file += "\n"
+
+	make_file += "clean:\n"
+	for prof in profiles:
+		make_file += f"	rm -rf $(OBJSDIR)/{prof} $({prof.upper()}-BINNAME)\n"
+
+	make_file += "\n"
+
+	make_file += f".PHONY: clean {' '.join(phony)}\n"
+
+	with open("Makefile", "w+") as mf:
+		mf.write(make_file)
+
+
+def ninja_escape(text: str, path: bool = False) -> str:
+	"""
+	Escapes the characters that ninja would read as its own, spaces and colons only matter in paths
+	"""
+
+	text = text.replace("$", "$$")
+	if path:
+		text = text.replace(" ", "$ ").replace(":", "$:")
+
+	return text
+
+
+def create_ninja():
+	"""
+	Writes a build.ninja with an edge for each object, tracking the includes through the dependency files,
+	and a link edge, the scripts and a phony target for each profile
+	"""
+
+	profiles = get_all_profiles()
+
+	if len(profiles) == 0:
+		print(f"{COLS.FG_RED}At least one profile is needed in the config_file, but none found{COLS.RESET}")
+		return
+
+	# default only holds what the others override, as with --all-profiles
+	if len(profiles) > 1 and "default" in profiles:
+		profiles.remove("default")
+
+	# the config is read from here, the sources from the project, once for every profile
+	profiles_settings = [parse_config_json(x) for x in profiles]
+
+	os.chdir(profiles_settings[0]["project_path"])
+
+	sources = [parse_file_path(x) for x in discover_sources(profiles_settings[0])]
+
+	ninja_file = "# generated by cpp_builder.py from cpp_builder_config.json\n"
+	ninja_file += "ninja_required_version = 1.3\n"
+	ninja_file += "\n"
+
+	ninja_file += "rule script\n"
+	ninja_file += "  command = ./$script\n"
+	ninja_file += "  description = $script\n"
+	ninja_file += "\n"
+
+	# its output is never written, so it runs every time the profile is built
+	ninja_file += "rule copy\n"
+	ninja_file += '  command = cmd /c "(if not exist $dir mkdir $dir) && copy /y $in $exe"\n' if os.name == "nt" else "  command = mkdir -p $dir && cp $in $exe\n"
+	ninja_file += "  description = COPY $exe\n"
+	ninja_file += "\n\n"
+
+	# how many profiles link each executable
+	shared: dict[str, int] = {}
+	for settings in profiles_settings:
+		shared[settings["exe_path_name"]] = shared.get(settings["exe_path_name"], 0) + 1
+
+	for prof, settings in zip(profiles, profiles_settings):
+		oargs = settings["specifics"]
+		epn = ninja_escape(settings["exe_path_name"], True)
+
+		ninja_file += f"# --- {prof} ---\n"
+		ninja_file += "\n"
+
+		# the compiler writes the includes of each object, ninja reads them back
+		ninja_file += f"rule cc_{prof}\n"
+		if oargs["dependency_extension"] == "d":
+			ninja_file += f'  command = {ninja_escape(settings["compiler"] + settings["cargs"] + settings["includes"])} {oargs["dependency_file"]}$dep {oargs["compile_only"]} {oargs["output_compiler"]}$out $in\n'
+			ninja_file += "  depfile = $dep\n"
+			ninja_file += "  deps = gcc\n"
+		else:
+			ninja_file += f'  command = {ninja_escape(settings["compiler"] + settings["cargs"] + settings["includes"])} /showIncludes {oargs["compile_only"]} {oargs["output_compiler"]}$out $in\n'
+			ninja_file += "  deps = msvc\n"
+		ninja_file += "  description = CC $in\n"
+		ninja_file += "\n"
+
+		ninja_file += f"rule link_{prof}\n"
+		ninja_file += f'  command = {ninja_escape(settings["linker"] + settings["largs"])} {oargs["output_linker"]}$out{ninja_escape(settings["libraries_paths"])} $in{ninja_escape(settings["libraries_names"])}\n'
+		ninja_file += "  description = LINK $out\n"
+		ninja_file += "\n"
+
+		# the objects wait for the pre script, without being rebuilt every time it runs
+		order_only = ""
+		if settings["scripts"]["pre"] != "":
+			ninja_file += f"build {prof}-pre: script\n"
+			ninja_file += f'  script = {ninja_escape(settings["scripts"]["pre"])}\n'
+			ninja_file += "\n"
+			order_only = f" || {prof}-pre"
+
+		objects: list[str] = []
+		for file in sources:
+			obj_path = ninja_escape(get_object_path(file, settings), True)
+			objects.append(f'{obj_path}.{oargs["object_extension"]}')
+
+			ninja_file += f'build {objects[-1]}: cc_{prof} {ninja_escape(f"{file[0]}/{file[1]}.{file[2]}", True)}{order_only}\n'
+			ninja_file += f'  dep = {obj_path}.{oargs["dependency_extension"]}\n'
+
+		ninja_file += "\n"
+
+		# ninja allows a single edge for each output, an executable shared by more profiles
+		# is linked by each one in its objects directory, and copied in place when the profile is built
+		if shared[settings["exe_path_name"]] > 1:
+			private = ninja_escape(f'{settings["objects_path"]}/{prof}/{os.path.basename(settings["exe_path_name"])}', True)
+			ninja_file += f"build {private}: link_{prof} {' '.join(objects)}\n"
+			ninja_file += f"build {prof}-exe: copy {private}\n"
+			ninja_file += f"  exe = {epn}\n"
+			ninja_file += f'  dir = {ninja_escape(os.path.dirname(settings["exe_path_name"]) or ".", True)}\n'
+			target = f"{prof}-exe"
+		else:
+			ninja_file += f"build {epn}: link_{prof} {' '.join(objects)}\n"
+			target = epn
+
+		if settings["scripts"]["post"] != "":
+			ninja_file += f"build {prof}-post: script | {target}\n"
+			ninja_file += f'  script = {ninja_escape(settings["scripts"]["post"])}\n'
+			target = f"{prof}-post"
+
+		ninja_file += f"build {prof}: phony {target}\n"
+		ninja_file += "\n\n"
+
+	ninja_file += f"default {profiles[0]}\n"
+
+	with open("build.ninja", "w") as nf:
+		nf.write(ninja_file)
+
+
+def is_excluded(path: str, globs: list[str]) -> bool:
+	"""
+	Returns if the file, or the directory, matches one of the globs
+	"""
+
+	return any(fnmatch.fnmatch(path, x) or fnmatch.fnmatch(path + "/", x) for x in globs)
+
+
+def discover_sources(settings: dict) -> list[str]:
+	"""
+	Returns the sources in the source directories that match the include globs and none of the exclude ones
+	A directory is read again only if its mtime changed, the listing of the others is taken from the cache
+	so an unchanged tree costs a stat for each directory
+	"""
+
+	start = time.monotonic()
+
+	cache_path = settings["objects_path"] + "/" + SOURCES_CACHE_FILENAME
 	try:
-		# sha1 hash calculation
-		with open(file, "rb") as f:
-			sha1.update(f.read())
-	except FileNotFoundError:
-		pass
+		with open(cache_path) as f:
+			listings = json.load(f)
+	except (OSError, ValueError):
+		listings = {}
+
+	globs = settings["source_globs"]
+	new_listings: dict[str, list] = {}
+	targets: list[str] = []
+
+	# the directories are visited in order, each before its subdirectories
+	pending: list[str] = list(reversed(settings["source_dirs"]))
+
+	while pending:
+		directory = pending.pop()
+
+		# excluded directories are not even read
+		if is_excluded(directory, globs["exclude"]):
+			continue
+
+		try:
+			mtime = os.stat(directory).st_mtime_ns
+		except OSError:
+			continue
+
+		# [mtime_ns, subdirectories, sources]
+		listing = listings.get(directory)
+		if listing is None or listing[0] != mtime:
+			subdirs: list[str] = []
+			files: list[str] = []
+
+			with os.scandir(directory) as entries:
+				for entry in entries:
+					if entry.is_dir(follow_symlinks=False):
+						subdirs.append(entry.name)
+					elif "." in entry.name and entry.name.rsplit(".", 1)[1] in SOURCE_FILES_EXTENSIONS:
+						files.append(entry.name)
+
+			listing = [mtime, sorted(subdirs), sorted(files)]
+
+		new_listings[directory] = listing
+
+		for name in listing[2]:
+			path = f"{directory}/{name}"
+			if any(fnmatch.fnmatch(path, x) for x in globs["include"]) and not is_excluded(path, globs["exclude"]):
+				targets.append(path)
+
+		pending += [f"{directory}/{x}" for x in reversed(listing[1])]
+
+	# written only when something changed, and replaced at once
+	if new_listings != listings:
+		try:
+			os.makedirs(settings["objects_path"], exist_ok=True)
+			with open(cache_path + ".tmp", "w") as f:
+				json.dump(new_listings, f)
+			os.replace(cache_path + ".tmp", cache_path)
+		except OSError:
+			pass
 
-	return sha1.hexdigest() # create the new hash
+	add_timing("discovery", start, settings)
 
+	return targets
 
-def calculate_new_hashes(old_hashes: dict, new_hashes: dict) -> None:
+
+def load_state(settings: dict, state: sqlite3.Connection, compile_all: bool) -> dict:
 	"""
-	Calculate the hashes for all the source files
+	Load in settings what the previous builds left in the state, returns the old hashes
 	"""
 
-	for file in old_hashes: # loop trough every file of each directory
+	old_hashes: dict = {}
+
+	# by not loading old hashes, all of the files results new
+	if not compile_all:
+		# load old hashes
+		old_hashes = load_old_hashes(state)
+
+	settings["includes_cache"]["parsed"] = load_includes_cache(state)
+	settings["deps_graph"] = load_deps_graph(state)
+	settings["objects"] = load_objects(state)
+	settings["link"]["fingerprint"] = load_link_fingerprint(settings["exe_path_name"], state)
+	settings["durations"]["known"] = load_durations(state)
 
-		new_hashes[file] = make_new_file_hash(file)
+	return old_hashes
 
 
-def load_old_hashes(directory: str) -> dict[str, str]:
+def reset_run(settings: dict) -> None:
 	"""
-	Load in old_hashes the hashes present in files_hash
+	Forget what is valid for a single build, the rest stays in memory for the next one
 	"""
-	hashes: dict[str, str] = {}
 
-	# creates the file
-	if not os.path.exists(directory + HASH_FILENAME):
-		return hashes
-	# read hashes from files and add them to old_hashes array
-	with open(directory + HASH_FILENAME, "r") as f:
-		while True:
-			data = f.readline()
-			if not data:
-				break
-			temp = data.split(":")
+	# cleared in place, other profiles might share them
+	settings["includes_cache"]["resolved"].clear()
+	settings["hasher"]["pending"].clear()
+	settings["durations"]["measured"] = {}
+	settings["timings"]["phases"] = {}
 
-			# remove trailing newline
-			temp[1] = temp[1].replace("\n", "")
-			hashes[temp[0]] = temp[1]
+	for counter in ["hits", "misses", "stored"]:
+		settings["cache"][counter] = 0
 
-	return hashes
+	settings["workers"]["remote"] = 0
+	settings["workers"]["local"] = 0
 
 
-def save_new_hashes(new_hashes: dict[str, str], directory: str) -> None:
+def new_build(settings: dict, state: sqlite3.Connection, old_hashes: dict, compile_all: bool) -> dict:
 	"""
-	Write all the hashes on files_hash
+	Returns what the build of a profile needs, and what it leaves
 	"""
 
-	with open(directory + HASH_FILENAME, "w") as f:
-		for i in new_hashes.keys():
-			f.write(i + ":")
-			f.write(new_hashes[i] + "\n")
+	return {
+	 "settings": settings,
+	 "state": state,
+	 "old_hashes": old_hashes,
+	 "new_hashes": {},
+	 "compile_all": compile_all,
+	 "units": [],
+	 "to_compile": [],
+	 "code": 0,
+	 "statuses": [],
+	 "links": True
+	}
 
 
-def get_to_compile(source_files: list[str], old_hashes: dict, new_hashes: dict, add_incl: list[str], sem: threading.Semaphore) -> list[str]:
+def prepare_build(job: dict, run_start: float) -> bool:
 	"""
-	return a list of files and their directories that need to be compiled
+	Runs the pre script and finds what needs to be compiled
+	returns False if there is nothing to do
 	"""
 
-	to_compile: list[tuple[str, str, str]] = [] # contains directory and filename
+	settings = job["settings"]
+	state = job["state"]
+	old_hashes = job["old_hashes"]
 
-	# checking which file need to be compiled
-	file: str = ""
-	rets: list = []
-	for file in source_files: # loop trough every file of each directory
+	job["code"] = 0
+	job["statuses"] = []
+	job["new_hashes"] = new_hashes = {}
 
-		fname = parse_file_path(file)
-		if fname[2] not in SOURCE_FILES_EXTENSIONS:
-			continue
+	if settings["scripts"]["pre"] != "":
+		print(COLS.FG_GREEN, f" --- {settings['label']}Pre Script ---", COLS.RESET)
+		exe_script("pre", settings)
 
-		rets.append([False, False])
+	if settings["pch"]["enabled"]:
+		select_pch_headers(settings)
 
-		threading.Thread(target=multi_thread, args=(to_recompile, rets[-1], sem, (file, old_hashes, new_hashes))).start()
+	if settings["unity"]["size"]:
+		make_unity_batches(settings["source_files"], settings)
 
-	exit = False
-	while not exit:
-		exit = True
+	# obtain new hashes
+	start = time.monotonic()
+	calculate_new_hashes(old_hashes, new_hashes, settings)
+	add_timing("hashing", start, settings)
 
-		for i in rets:
-			if i[1] is False:
-				exit = False
-				break
+	# get the file needed to compile
+	start = time.monotonic()
+	to_compile = get_to_compile(settings["source_files"], old_hashes, new_hashes, settings)
+	add_timing("scan", start, settings)
 
-	for i in rets:
-		if i[0] is not False:
-			fname = parse_file_path(i[0])
-			to_compile.append(fname)
+	save_includes_cache(settings, state)
+	save_deps_graph(settings["deps_graph"], state)
 
-	return to_compile
+	# the sources in batches are compiled through their batch
+	units = to_compile
+	if settings["unity"]["size"]:
+		units, to_compile = get_unity_units(to_compile, settings)
+
+	job["units"] = units
+	job["to_compile"] = to_compile
+
+	# if to_compile is empty, and the objects have not changed, no need to do anything
+	if not units and not (job["links"] and to_relink(get_link_objects(settings), settings)):
+		print(f"{COLS.FG_YELLOW} --- {settings['label']}Compilation and linking skipped due to no new or modified files ---{COLS.RESET}")
 
+		# contents are the same, but the stats might not be, saves hashing them again
+		if not job["compile_all"]:
+			save_new_hashes(new_hashes, old_hashes, state)
+		old_hashes.update(new_hashes)
 
-def compile(to_compile: list[str], settings: dict, compilations: list[dict]) -> None:
+		add_timing("total", run_start, settings)
+		save_timings(settings, state, "up to date")
+		return False
+
+	if not os.path.exists(settings["objects_path"]):
+		os.makedirs(settings["objects_path"])
+
+	return True
+
+
+def finish_build(job: dict, run_start: float) -> None:
 	"""
-	Calls the compiler with the specified arguments
+	Saves the new state of a build, and runs the post script
+	on success old_hashes is updated, so the next build only sees what changes after this one
 	"""
 
-	cexe = settings["compiler"]
-	includes = settings["includes"]
-	cargs = settings["cargs"]
-	obj_dir = settings["objects_path"] + "/" + settings["profile"]
-	oargs = settings["specifics"]
-	colors = oargs["force_colors"] if settings["printing"]["colors"] else oargs["no_colors"]
+	settings = job["settings"]
+	state = job["state"]
+	new_hashes = job["new_hashes"]
 
-	for file in to_compile:
-		obj_name: str = "".join(file[0].split("/"))
+	# nothing is saved, the next build tries again, but how long it took is
+	if job["code"] != 0:
+		add_timing("total", run_start, settings)
+		save_timings(settings, state, "failed")
+		return
 
-		command = f'{cexe} {colors}{cargs}{includes} {oargs["compile_only"]} {oargs["output_compiler"]}{obj_dir}/{obj_name}{file[1]}.{oargs["object_extension"]} {file[0]}/{file[1]}.{file[2]}'
+	update_deps_graph(job["to_compile"], new_hashes, settings)
+	save_deps_graph(settings["deps_graph"], state)
+	save_objects(job["to_compile"], settings, state)
+	save_link_fingerprint(settings["exe_path_name"], settings["link"]["fingerprint"], state)
+	save_durations(settings, state)
 
-		result = {
-		 "result": COMPILATION_STATUS_COMPILING,
-		 "name": f"{file[1]}.{file[2]}",
-		 "output": "",
-		 "errors": "",
-		 "command": command
-		}
-		compilations.append(result)
-		threading.Thread(target=exe_command, args=(command, result, settings["semaphore"])).start()
+	if settings["scripts"]["post"] != "":
+		print("\n", COLS.FG_GREEN, f" --- {settings['label']}Post Script ---", COLS.RESET)
+		exe_script("post", settings)
+
+	# do not overwrite the old hashes
+	if not job["compile_all"]:
+		save_new_hashes(new_hashes, job["old_hashes"], state)
+	job["old_hashes"].update(new_hashes)
 
+	add_timing("total", run_start, settings)
+	save_timings(settings, state, "done")
 
-def link(to_compile: list[str], settings: dict, status: dict) -> None:
+
+def build(builds: list[dict], run_start: float) -> None:
 	"""
-	Link together all the files that have been compiled with the specified libraries and arguments
+	Compiles and links what changed since the old hashes of each build, and saves their new state
+	the compilations of all the builds share the commands limiter, the links are one after the other
 	"""
 
-	lexe = settings["linker"]
-	largs = settings["largs"]
-	epn = settings["exe_path_name"]
-	libs = settings["libraries_paths"]
-	obj_dir = settings["objects_path"] + "/" + settings["profile"]
-	oargs = settings["specifics"]
+	# the last profile linking an executable is the one that leaves it
+	owners = {x["settings"]["exe_path_name"]: x for x in builds}
+	for job in builds:
+		job["links"] = owners[job["settings"]["exe_path_name"]] is job
 
-	command = f'{lexe}{largs} {oargs["output_linker"]}{epn}{libs}'
+	todo = [x for x in builds if prepare_build(x, run_start)]
 
-	for path, subdirs, files in os.walk(obj_dir):
-		for name in files:
-			file = parse_file_path(name)
-			if (file[2] != oargs["object_extension"]):
-				continue
-			obj_name: str = "".join(file[0].split("/"))
+	if not todo:
+		return
 
-			command += f' {obj_dir}/{obj_name}{file[1]}.{oargs["object_extension"]}'
+	# manages compilation and printing
+	try:
+		compile_and_command(todo, run_start)
+	except KeyboardInterrupt:
+		for job in todo:
+			add_timing("total", run_start, job["settings"])
+			save_timings(job["settings"], job["state"], "cancelled")
+		raise
 
-	command += settings["libraries_names"]
+	for job in todo:
+		finish_build(job, run_start)
 
-	status["name"] = epn
-	status["command"] = command
-	threading.Thread(target=exe_command, args=(command, status, settings["semaphore"])).start()
 
+def open_inotify(directories: list[str], ignored: list[str]) -> dict | None:
+	"""
+	Returns an inotify instance watching the given directories and their subdirectories
+	None if inotify is not available
+	"""
 
-def exe_script(name: str, settings: dict):
-	nm = settings["scripts"][name]
-	result = {
-	 "result": COMPILATION_STATUS_COMPILING,
-	 "name": nm,
-	 "output": "",
-	 "errors": "",
-	 "command": nm
+	import ctypes
+	import ctypes.util
+
+	try:
+		libc = ctypes.CDLL(ctypes.util.find_library("c"), use_errno=True)
+		fd = libc.inotify_init1(os.O_NONBLOCK)
+	except (OSError, AttributeError, TypeError):
+		return None
+
+	if fd < 0:
+		return None
+
+	watcher = {
+	 "fd": fd,
+	 "libc": libc,
+	 "dirs": {},
+	 "ignored": ignored
 	}
-	threading.Thread(target=exe_command, args=(f'./{nm}', result, settings["semaphore"])).start()
-	print_progress([result], settings)
-	print("")
-	print_report([result], settings)
 
+	for directory in directories:
+		inotify_add_tree(watcher, directory)
 
-def get_all_profiles():
+	return watcher
 
-	config_filename = "cpp_builder_config.json"
-	if os.path.isfile(config_filename):
-		config_file = json.load(open(config_filename))
-	else:
-		print(COLS.FG_YELLOW, f"[WARNING]{COLS.FG_LIGHT_RED} Config file \"{config_filename}\" not found", COLS.RESET)
-		return dict
 
-	profiles: list[str] = []
+def is_inside(path: str, directories: list[str]) -> bool:
+	path = os.path.normpath(path)
+	return any(path == x or path.startswith(x + os.sep) or x == "." for x in directories)
 
-	for k in config_file:
-		if k not in ["scripts", "compiler", "directories"]:
-			profiles.append(k)
 
-	return profiles
+def inotify_add_tree(watcher: dict, directory: str) -> list[str]:
+	"""
+	Watch the given directory and all of its subdirectories
+	returns the files already in them, the ones written before the watch started would be missed
+	"""
 
+	found: list[str] = []
 
-def create_makefile():
+	for path, subdirs, files in os.walk(directory):
+		if is_inside(path, watcher["ignored"]):
+			subdirs.clear()
+			continue
 
-	profiles = get_all_profiles()
+		wd = watcher["libc"].inotify_add_watch(watcher["fd"], path.encode(), INOTIFY_MASK)
+		if wd >= 0:
+			watcher["dirs"][wd] = path
 
-	if len(profiles) == 0:
-		print(f"{COLS.FG_RED}At least one profile is needed in the config_file, but none found{COLS.RESET}")
+		found += [f"{path}/{name}" for name in files]
 
-	# first debug options
-	settings = parse_config_json(profiles[0])
+	return found
 
-	# targets
-	os.chdir(settings["project_path"])
 
-	# obtain new hashes
-	hashes: dict = {}
+def read_inotify(watcher: dict) -> set[str]:
+	"""
+	Returns the files created, modified, moved or deleted since the last read
+	"""
 
-	calculate_new_hashes({}, hashes)
+	changed: set[str] = set()
 
-	# get the file needed to compile
-	to_compile = get_to_compile(settings["source_files"], {}, hashes, settings["raw_includes"], settings["semaphore"])
+	while True:
+		try:
+			data = os.read(watcher["fd"], 65536)
+		except BlockingIOError:
+			return changed
 
-	make_file = ""
+		offset = 0
+		while offset < len(data):
+			wd, mask, cookie, length = struct.unpack_from("iIII", data, offset)
+			name = data[offset + 16:offset + 16 + length].rstrip(b"\0").decode(errors="replace")
+			offset += 16 + length
 
-	# variables
+			directory = watcher["dirs"].get(wd)
 
-	make_file += f"CC       = {settings['compiler']}\n"
-	make_file += f"BINNAME  = {settings['exe_path_name']}\n"
-	make_file += f"OBJSDIR  = {settings['objects_path']}\n"
-	make_file += f"INCLUDES = {settings['includes']}\n"
-	make_file += "PROFILE  = \n"
-	make_file += "CARGS    = \n"
+			if mask & INOTIFY_IGNORED:
+				watcher["dirs"].pop(wd, None)
+				continue
 
-	make_file += "\n"
+			if directory is None or not name:
+				continue
 
-	make_file += "OBJS = \\\n"
-	for file in to_compile:
-		obj_name: str = "".join(file[0].split("/")) + file[1]
-		make_file += f"	$(OBJSDIR)/$(PROFILE)/{obj_name}.o \\\n"
+			path = f"{directory}/{name}"
+			if is_inside(path, watcher["ignored"]):
+				continue
 
-	make_file += "\n"
+			# new directories need their own watch
+			if mask & INOTIFY_ISDIR:
+				if mask & (INOTIFY_CREATE | INOTIFY_MOVED_TO):
+					changed.update(inotify_add_tree(watcher, path))
+				continue
 
-	make_file += "SOURCES = \\\n"
-	for file in to_compile:
-		obj_name: str = "".join(file[0].split("/")) + file[1]
-		make_file += f"	{file[0]}/{file[1]} \\\n"
+			changed.add(path)
 
-	make_file += "\n\n"
 
-	make_file += ".SUFFIXES:\n"
+def snapshot_files(directories: list[str], ignored: list[str], config_path: str) -> dict[str, tuple[int, int]]:
+	"""
+	Returns the mtime and size of every file in the given directories, and of the config file, for polling them when there is no inotify
+	"""
 
-	make_file += "\n"
+	stats: dict[str, tuple[int, int]] = {}
 
-	make_file += "$(SOURCES):\n"
-	make_file += "	$(CC) $@.cpp $(CARGS) $(INCLUDES) -c -o $(OBJSDIR)/$(PROFILE)/$(subst /,,$@).o\n"
+	try:
+		stat = os.stat(config_path)
+		stats[config_path] = (stat.st_mtime_ns, stat.st_size)
+	except OSError:
+		pass
 
-	make_file += "\n\n"
+	for directory in directories:
+		for path, subdirs, files in os.walk(directory):
+			if is_inside(path, ignored):
+				subdirs.clear()
+				continue
 
-	make_file += "# --- profiles ---\n"
+			for name in files:
+				try:
+					stat = os.stat(f"{path}/{name}")
+				except OSError:
+					continue
+				stats[f"{path}/{name}"] = (stat.st_mtime_ns, stat.st_size)
 
-	make_file += "\n\n"
+	return stats
 
-	scripts_used: list[str] = []
 
-	for prof in profiles:
-		PROF = prof.upper()
+def open_watch_socket(path: str) -> socket.socket | None:
+	"""
+	Returns a unix socket listening for build requests, None if unix sockets are not available
+	"""
 
-		settings = parse_config_json(prof)
+	import socket
 
-		# Profiles
-		make_file += f"# --- {prof} ---\n"
-		make_file += "\n"
-		make_file += f"{PROF}-CARGS    = {settings['cargs']}\n"
-		make_file += f"{PROF}-LARGS    = {settings['largs']}\n"
-		make_file += f"{PROF}-LIBPATH  = {settings['libraries_paths']}\n"
-		make_file += f"{PROF}-LIBNAMES = {settings['libraries_names']}\n"
-		make_file += "\n\n"
+	if not hasattr(socket, "AF_UNIX"):
+		return None
 
-		make_file += f"{prof}-link: PROFILE = {prof}\n"
-		make_file += f"{prof}-link: CARGS = $({PROF}-CARGS)\n"
-		make_file += f"{prof}-link: $(SOURCES)\n"
-		make_file += f"	$(CC) $({PROF}-LARGS) -o $(BINNAME) $({PROF}-LIBPATH) $(OBJS) $({PROF}-LIBNAMES)\n"
+	if os.path.exists(path):
+		os.remove(path)
 
-		make_file += "\n"
+	server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+	server.bind(path)
+	server.listen()
 
-		pre_rule = ""
-		post_rule = ""
+	return server
 
-		if settings["scripts"]["pre"] != "":
-			pre_rule = "{prof}-pre "
-			scripts_used.append(pre_rule)
-			make_file += f"{prof}-pre:\n"
-			make_file += f"	./{settings['scripts']['pre']}\n"
-			make_file += "\n"
 
-		if settings["scripts"]["post"] != "":
-			post_rule = f"{prof}-post"
-			scripts_used.append(post_rule)
-			make_file += f"{prof}-post:\n"
-			make_file += f"	./{settings['scripts']['post']}\n"
-			make_file += "\n"
+def build_reply(builds: list[dict], seconds: float) -> bytes:
+	"""
+	Returns the json line sent to a client, with the result of the last build
+	"""
 
-		make_file += f"{prof}: | {pre_rule}{prof}-link {post_rule}\n"
+	code = max(x["code"] for x in builds)
+	statuses = [x for job in builds for x in job["statuses"]]
+
+	reply = {
+	 "result": ["done", "failed", "failed", "failed"][min(code, 3)] if statuses else "up to date",
+	 "code": code,
+	 "seconds": round(seconds, 3),
+	 "units": [{
+	  "name": x["name"],
+	  "result": ["compiling", "done", "failed", "cancelled"][x["result"]],
+	  "output": x["output"],
+	  "errors": x["errors"]
+	 } for x in statuses]
+	}
 
-		make_file += "\n"
+	return (json.dumps(reply) + "\n").encode()
 
-	make_file += "\n"
 
-	make_file += "# --- clean ---\n"
-	make_file += "\n"
+def watch_sources(builds: list[dict], launch_dir: str) -> None:
+	"""
+	Builds, then keeps everything in memory and builds again every time a file is saved,
+	or a client asks for it on the watch socket
+	"""
 
-	make_file += "clean:\n"
-	make_file += "	rm -r $(OBJSDIR)/*\n"
-	make_file += "	rm -r $(BINNAME)\n"
+	import select
 
-	make_file += "\n\n"
+	settings = builds[0]["settings"]
 
-	make_file += ".PHONY: clean "
-	for i in scripts_used:
-		make_file += i
+	# the config is read from where the builder is launched, the files are relative to the project
+	config_path = os.path.normpath(os.path.relpath(os.path.join(launch_dir, CONFIG_FILENAME)))
+	directories = list(dict.fromkeys(settings["source_dirs"] + settings["raw_includes"]))
+	watched = [os.path.normpath(x) for x in directories]
 
-	make_file += "\n"
+	# the builder writes there, changes would never end
+	ignored = [os.path.normpath(settings["objects_path"]), os.path.normpath(os.path.dirname(settings["exe_path_name"]) or settings["exe_path_name"])]
 
-	with open("Makefile", "w+") as mf:
-		mf.write(make_file)
+	start = time.monotonic()
+	build(builds, start)
+	last_reply = build_reply(builds, time.monotonic() - start)
 
+	for job in builds:
+		job["compile_all"] = False
 
-def main():
+	watcher = open_inotify(directories, ignored)
+	snapshot = None
+	if watcher is not None:
+		# just the config, not everything beside it
+		wd = watcher["libc"].inotify_add_watch(watcher["fd"], (os.path.dirname(config_path) or ".").encode(), INOTIFY_MASK)
+		watcher["dirs"].setdefault(wd, os.path.dirname(config_path) or ".")
+	else:
+		snapshot = snapshot_files(directories, ignored, config_path)
 
-	args = sys.argv[1:]
+	socket_path = settings["objects_path"] + "/" + settings["profile"] + "/" + WATCH_SOCKET_FILENAME
+	server = open_watch_socket(socket_path)
+	clients: dict[socket.socket, bytes] = {}
 
-	# makefile option
-	if "-e" in args:
-		create_makefile()
-		exit(0)
+	print(f"\n{COLS.FG_GREEN} --- Watching {', '.join(directories)} ({'inotify' if watcher is not None else 'polling'}), socket {socket_path if server is not None else 'unavailable'} ---{COLS.RESET}")
 
-	# generate an empty profile
-	if "--gen" in args:
-		with open("cpp_builder_config.json", "w") as f:
-			f.write(TEMPLATE)
-		exit(0)
+	try:
+		while True:
+			waiting = list(clients) + ([server] if server is not None else []) + ([watcher["fd"]] if watcher is not None else [])
+			readable, _, _ = select.select(waiting, [], [], None if watcher is not None else WATCH_POLL_INTERVAL)
+
+			changed: set[str] = set()
+			requests: list[tuple[socket.socket, str]] = []
+
+			for item in readable:
+				if item is server:
+					client, _ = server.accept()
+					clients[client] = b""
+				elif watcher is not None and item == watcher["fd"]:
+					# editors write in more steps, wait for all of them
+					time.sleep(WATCH_DEBOUNCE)
+					changed |= read_inotify(watcher)
+				else:
+					data = item.recv(4096)
+					if not data:
+						clients.pop(item)
+						item.close()
+						continue
+
+					clients[item] += data
+					while b"\n" in clients[item]:
+						line, clients[item] = clients[item].split(b"\n", 1)
+						requests.append((item, line.strip().decode(errors="replace")))
+
+			if watcher is None:
+				new_snapshot = snapshot_files(directories, ignored, config_path)
+				changed = {x for x in new_snapshot.keys() | snapshot.keys() if new_snapshot.get(x) != snapshot.get(x)}
+				snapshot = new_snapshot
+
+			# the other files beside the config do not matter
+			changed = {x for x in changed if os.path.normpath(x) == config_path or is_inside(x, watched)}
+
+			if config_path in {os.path.normpath(x) for x in changed}:
+				# everything depends on it, start again from scratch
+				print(f"\n{COLS.FG_YELLOW} --- {CONFIG_FILENAME} changed, restarting ---{COLS.RESET}")
+				if server is not None:
+					server.close()
+					os.remove(socket_path)
+				for job in builds:
+					job["state"].close()
+				os.chdir(launch_dir)
+				os.execv(sys.executable, [sys.executable] + sys.argv)
+
+			build_requested = any(x[1] == "build" for x in requests)
+
+			if changed or build_requested:
+				if changed:
+					print(f"\n{COLS.FG_GREEN} --- Changed: {', '.join(sorted(changed)[:5])}{' ...' if len(changed) > 5 else ''} ---{COLS.RESET}")
+
+				start = time.monotonic()
+				sources = discover_sources(settings)
+				for job in builds:
+					reset_run(job["settings"])
+					job["settings"]["source_files"] = sources
+
+				build(builds, start)
+
+				# a request when nothing changed gets the result of the last build
+				if any(x["statuses"] or x["code"] != 0 for x in builds):
+					last_reply = build_reply(builds, time.monotonic() - start)
+
+			for client, request in requests:
+				try:
+					if request == "build":
+						client.sendall(last_reply)
+					else:
+						client.sendall((json.dumps({"result": "error", "error": f"unknown request {request}"}) + "\n").encode())
+				except OSError:
+					clients.pop(client, None)
+					client.close()
+
+	except KeyboardInterrupt:
+		print(f"\n{COLS.FG_YELLOW} --- Stopped watching ---{COLS.RESET}")
+
+	finally:
+		if server is not None:
+			server.close()
+			if os.path.exists(socket_path):
+				os.remove(socket_path)
+
+
+def parse_options(args: list[str], settings: dict) -> dict[str, bool]:
+	"""
+	Apply the command line switches to settings, returns the ones that are not settings
+	"""
 
-	if "--help" in args or "-h" in args:
-		print(HELP)
-		exit(0)
+	import hashlib
 
-	# profile selector
-	if "-p" not in args:
-		print(f"{COLS.FG_RED}You need to specify a profile with '-p'{COLS.RESET}")
-		exit(1)
+	options = {
+	 "compile_all": False,
+	 "report": False,
+	 "watch": False
+	}
 
-	compilation_profile = parse_profile_name(args)
+	# switches with a value consume the next argument
+	args_iter = iter(args)
 
-	indx = args.index("-p")
-	args.pop(indx + 1)
-	args.pop(indx)
+	for arg in args_iter:
 
-	# settings is garanteted to have all of the necessary values
-	settings = parse_config_json(compilation_profile)
+		if "-n" == arg:
+			if next(args_iter, None) == "auto":
+				settings["limiter"] = new_limiter(get_auto_threads(), True)
+			else:
+				threads = parse_num_threads(sys.argv)
+				# -1 for no limit
+				settings["limiter"] = new_limiter(threads if threads > 0 else sys.maxsize)
+			settings["timings"]["threads"] = settings["limiter"]["base"]
+			continue
+
+		if "--report" == arg:
+			options["report"] = True
+			continue
 
-	compile_all = False
+		if "--fail-fast" == arg:
+			settings["stop_after"] = 1
+			continue
 
-	for arg in args:
+		if "-k" == arg or "--keep-going" == arg:
+			settings["stop_after"] = max(parse_number(sys.argv, arg, 0), 0)
+			next(args_iter, None)
+			continue
 
-		if "-n" == arg:
-			settings["semaphore"] = threading.Semaphore(parse_num_threads(sys.argv))
+		if "--watch" == arg:
+			options["watch"] = True
+			continue
+
+		if "--workers" == arg:
+			try:
+				settings["workers"]["hosts"] = [parse_address(x) for x in next(args_iter, "").split(",") if x]
+			except ValueError:
+				print(f"{COLS.FG_RED}Workers must be given as host:port,host:port Exiting{COLS.RESET}")
+				exit(1)
+			continue
+
+		if "--scan-threads" == arg:
+			settings["scan_threads"] = parse_number(sys.argv, "--scan-threads", None)
+			if settings["scan_threads"] is not None and settings["scan_threads"] < 1:
+				print(f"{COLS.FG_RED}--scan-threads needs at least 1 thread Exiting{COLS.RESET}")
+				exit(1)
+			next(args_iter, None)
+			continue
+
+		if "--unity" == arg:
+			settings["unity"]["size"] = max(parse_number(sys.argv, "--unity", 0), 0)
+			next(args_iter, None)
+			continue
+
+		if "--pch" == arg:
+			settings["pch"]["enabled"] = True
+			continue
+
+		if "--preprocessed-check" == arg:
+			settings["preprocessed_check"] = True
+			continue
+
+		if "--no-cache" == arg:
+			settings["cache"]["enabled"] = False
+			continue
+
+		if "--cache-size" == arg:
+			settings["cache"]["size"] = parse_number(sys.argv, "--cache-size", CACHE_DEFAULT_SIZE)
+			next(args_iter, None)
+			continue
+
+		if "--cache-compression" == arg:
+			compression = next(args_iter, "")
+			if compression not in CACHE_COMPRESSIONS:
+				print(f"{COLS.FG_RED}Unknown compression \"{compression}\" Exiting{COLS.RESET}")
+				exit(1)
+			settings["cache"]["compression"] = compression
+			continue
+
+		if "--hash" == arg:
+			algorithm = next(args_iter, "")
+			if algorithm not in hashlib.algorithms_available:
+				print(f"{COLS.FG_RED}Unknown hash algorithm \"{algorithm}\" Exiting{COLS.RESET}")
+				exit(1)
+			settings["hasher"]["algorithm"] = algorithm
 			continue
 		# printing options
 
@@ -1128,7 +4339,7 @@ def main():
 			continue
 
 		if "-a" == arg:
-			compile_all = True
+			options["compile_all"] = True
 			continue
 
 		# unknown switches, error
@@ -1136,47 +4347,125 @@ def main():
 		print(HELP)
 		exit(1)
 
-	# script are executed from the project path
-	os.chdir(settings["project_path"])
+	return options
 
-	if settings["scripts"]["pre"] != "":
-		print(COLS.FG_GREEN, " --- Pre Script ---", COLS.RESET)
-		exe_script("pre", settings)
 
-	hash_path = settings["objects_path"] + "/" + compilation_profile + "/"
+def main():
 
-	old_hashes: dict = {}
+	run_start = time.monotonic()
 
-	# by not loading old hashes, all of the files results new
-	if not compile_all:
-		# load old hashes
-		old_hashes = load_old_hashes(hash_path)
+	args = sys.argv[1:]
 
-	new_hashes: dict = {}
-	# obtain new hashes
-	calculate_new_hashes(old_hashes, new_hashes)
+	# makefile or ninja option
+	if "-e" in args:
+		if "ninja" in args:
+			create_ninja()
+		else:
+			create_makefile()
+		exit(0)
 
-	# get the file needed to compile
-	to_compile = get_to_compile(settings["source_files"], old_hashes, new_hashes, settings["raw_includes"], settings["semaphore"])
+	# generate an empty profile
+	if "--gen" in args:
+		with open("cpp_builder_config.json", "w") as f:
+			f.write(TEMPLATE)
+		exit(0)
+
+	if "--help" in args or "-h" in args:
+		print(HELP)
+		exit(0)
+
+	# compiles for the others, no config needed
+	if "--worker" in args:
+		limiter = new_limiter(DEFAULT_THREADS)
+		if "-n" in args:
+			threads = parse_num_threads(sys.argv)
+			limiter = new_limiter(get_auto_threads(), True) if args[args.index("-n") + 1] == "auto" else new_limiter(threads if threads > 0 else sys.maxsize)
+
+		run_worker(args[args.index("--listen") + 1] if "--listen" in args else WORKER_DEFAULT_ADDRESS, limiter)
+		exit(0)
+
+	# profile selector
+	if "--all-profiles" in args:
+		args.remove("--all-profiles")
+		# default is what the others are made from
+		compilation_profiles = [x for x in get_all_profiles() if x != "default"] or ["default"]
+
+	elif "-p" in args:
+		compilation_profiles = parse_profile_name(args).split(",")
+
+		indx = args.index("-p")
+		args.pop(indx + 1)
+		args.pop(indx)
+
+	else:
+		print(f"{COLS.FG_RED}You need to specify a profile with '-p'{COLS.RESET}")
+		exit(1)
+
+	# settings is garanteted to have all of the necessary values
+	start = time.monotonic()
+	settings = parse_config_json(compilation_profiles[0])
+	add_timing("config", start, settings)
+
+	options = parse_options(args, settings)
+
+	profiles_settings: list[dict] = [settings]
+
+	# the other profiles share the sources, the hashes, the includes found and the commands limiter
+	for prof in compilation_profiles[1:]:
+		start = time.monotonic()
+		other = parse_config_json(prof)
+		add_timing("config", start, other)
+
+		parse_options(args, other)
+		for key in ["limiter", "progress", "hasher", "cache", "workers"]:
+			other[key] = settings[key]
+		other["includes_cache"]["resolved"] = settings["includes_cache"]["resolved"]
+
+		profiles_settings.append(other)
 
-	# if to_compile is empty, no need to do anything
-	if not to_compile:
-		print(f"{COLS.FG_YELLOW} --- Compilation and linking skipped due to no new or modified files ---{COLS.RESET}")
+	if len(profiles_settings) > 1:
+		for prof_settings in profiles_settings:
+			prof_settings["label"] = prof_settings["profile"] + ": "
+
+	launch_dir = os.getcwd()
+
+	# script are executed from the project path
+	os.chdir(settings["project_path"])
+
+	if options["report"]:
+		for prof_settings in profiles_settings:
+			if len(profiles_settings) > 1:
+				print(f'\n{COLS.FG_GREEN} === {prof_settings["profile"]} ==={COLS.RESET}')
+			state_dir = prof_settings["objects_path"] + "/" + prof_settings["profile"] + "/"
+			if not os.path.exists(state_dir + STATE_FILENAME):
+				print(f"{COLS.FG_YELLOW} --- No build recorded for this profile ---{COLS.RESET}")
+				continue
+			print_timing_report(open_state(state_dir))
 		return
 
-	if not os.path.exists(settings["objects_path"]):
-		os.makedirs(settings["objects_path"])
+	# only a build needs the sources and the directories
+	sources = discover_sources(settings)
 
-	compile_and_command(to_compile, settings)
-	# manages compilation and printing
+	builds: list[dict] = []
+	for prof_settings in profiles_settings:
+		prof_settings["source_files"] = sources
+		prepare_directories(prof_settings)
+		state = open_state(prof_settings["objects_path"] + "/" + prof_settings["profile"] + "/")
+		builds.append(new_build(prof_settings, state, load_state(prof_settings, state, options["compile_all"]), options["compile_all"]))
 
-	if settings["scripts"]["post"] != "":
-		print("\n", COLS.FG_GREEN, " --- Post Script ---", COLS.RESET)
-		exe_script("post", settings)
+	if options["watch"]:
+		watch_sources(builds, launch_dir)
+		return
 
-	# do not overwrite the old hashes
-	if not compile_all:
-		save_new_hashes(new_hashes, hash_path)
+	# ctrl-c, the compilers have already been stopped
+	try:
+		build(builds, run_start)
+	except KeyboardInterrupt:
+		exit(130)
+
+	code = max(x["code"] for x in builds)
+	if code != 0:
+		exit(code)
 
 
 if __name__ == "__main__":